@@ -1,5 +1,6 @@
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 import asyncio
 import random
 import aiohttp
@@ -29,11 +30,44 @@ from config import (
 )
 
 
+@lru_cache(maxsize=1)
+def _get_openai_client() -> AsyncOpenAI:
+    # One client per process so every provider shares the same keep-alive connection pool.
+    return AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+
+ASSEMBLYAI_UPLOAD_CHUNK_BYTES = 5 * 1024 * 1024
+
+# Word-level segmenters split after a word ending in one of these characters.
+_WHISPER_SPLIT_CHARS = frozenset(".!?…:;")
+_ASSEMBLYAI_SPLIT_CHARS = frozenset(".!?…")
+
+_TRANSLATE_SYSTEM_PROMPT = (
+    "You are a professional translator. "
+    "Translate the user's text into the target language named in the final instruction. "
+    "If the text is a dialogue, format it as a dialogue using dashes. "
+    "Preserve the emotional tone and religious expressions. "
+    "Avoid word-for-word translation. "
+    "Return ONLY the translated text without comments."
+)
+
+
+async def _iter_file_chunks(file_path: Path, chunk_size: int = ASSEMBLYAI_UPLOAD_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
 class AIProvider(BaseAIProvider):
     def __init__(self, chat_model: str, whisper_model: str) -> None:
         self.chat_model = chat_model
         self.whisper_model = whisper_model
-        self.client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        self.client = _get_openai_client()
+        self._assemblyai_http: aiohttp.ClientSession | None = None
+
+    async def close(self) -> None:
+        if self._assemblyai_http is not None and not self._assemblyai_http.closed:
+            await self._assemblyai_http.close()
 
     # ============================================================
     # ✅ ЕДИНАЯ ТОЧКА ТРАНСКРИБАЦИИ (Whisper или AssemblyAI)
@@ -54,15 +88,16 @@ class AIProvider(BaseAIProvider):
         # Network-safe retry loop for intermittent upstream read/connect timeouts.
         response = None
         last_exc: Exception | None = None
+        # Read the audio once; retries re-send the same buffer instead of re-reading the file.
+        audio_upload = (file_path.name, file_path.read_bytes())
         for attempt in range(1, 6):
             try:
-                with open(file_path, "rb") as audio_file:
-                    response = await self.client.audio.transcriptions.create(
-                        model=self.whisper_model,          # whisper-1 / gpt-4o-transcribe family
-                        file=audio_file,
-                        response_format="verbose_json",
-                        timestamp_granularities=["word", "segment"],
-                    )
+                response = await self.client.audio.transcriptions.create(
+                    model=self.whisper_model,          # whisper-1 / gpt-4o-transcribe family
+                    file=audio_upload,
+                    response_format="verbose_json",
+                    timestamp_granularities=["word", "segment"],
+                )
                 break
             except (APIConnectionError, APITimeoutError) as exc:
                 last_exc = exc
@@ -122,17 +157,17 @@ class AIProvider(BaseAIProvider):
                     continue
 
                 # Split on natural pause between words (helps avoid merging neighboring phrases)
-                if prev_end is not None and (float(w_start) - float(prev_end)) >= 0.65 and buf:
+                if prev_end is not None and (float(w_start) - prev_end) >= 0.65 and buf:
                     flush_segment()
 
                 if seg_start is None:
                     seg_start = w_start
                 seg_end = w_end
                 buf.append(txt)
-                prev_end = w_end
+                prev_end = float(w_end)
 
                 # split by punctuation or conservative chunk size
-                if txt.endswith((".", "!", "?", "…", ":", ";")) or len(buf) >= 9:
+                if txt[-1] in _WHISPER_SPLIT_CHARS or len(buf) >= 9:
                     flush_segment()
 
             flush_segment()
@@ -156,9 +191,16 @@ class AIProvider(BaseAIProvider):
 
     async def _transcribe_hybrid(self, file_path: Path) -> Dict[str, Any]:
         """Whisper for robust text/timing + AssemblyAI for speaker labels."""
-        whisper = await self._transcribe_with_whisper(file_path)
+        # Both providers are independent network round-trips: run AssemblyAI alongside Whisper.
+        asm_task = asyncio.create_task(self._transcribe_with_assemblyai(file_path))
+        try:
+            whisper = await self._transcribe_with_whisper(file_path)
+        except BaseException:
+            asm_task.cancel()
+            raise
+
         try:
-            asm = await self._transcribe_with_assemblyai(file_path)
+            asm = await asm_task
         except Exception:
             # Keep robust fallback: if AssemblyAI fails, return Whisper as-is.
             return whisper
@@ -365,165 +407,171 @@ class AIProvider(BaseAIProvider):
     # ============================================================
     # ✅ ASSEMBLYAI
     # ============================================================
+    def _get_assemblyai_session(self) -> aiohttp.ClientSession:
+        # Kept open between calls so upload, submit and every poll reuse keep-alive connections.
+        if self._assemblyai_http is None or self._assemblyai_http.closed:
+            self._assemblyai_http = aiohttp.ClientSession(
+                headers={
+                    "authorization": ASSEMBLYAI_API_KEY,
+                    "content-type": "application/json",
+                },
+                connector=aiohttp.TCPConnector(limit=8),
+            )
+        return self._assemblyai_http
+
     async def _transcribe_with_assemblyai(self, file_path: Path) -> Dict[str, Any]:
-        headers = {
-            "authorization": ASSEMBLYAI_API_KEY,
-            "content-type": "application/json",
+        session = self._get_assemblyai_session()
+        # 1️⃣ Загружаем файл
+        async with session.post(
+            "https://api.assemblyai.com/v2/upload",
+            data=_iter_file_chunks(file_path),
+        ) as upload_resp:
+            upload_data = await upload_resp.json()
+            upload_url = upload_data.get("upload_url")
+            if not upload_url:
+                raise RuntimeError(f"AssemblyAI upload failed: status={upload_resp.status} body={upload_data}")
+
+        # 2️⃣ Запускаем транскрипцию
+        transcript_payload = {
+            "audio_url": upload_url,
+            "language_detection": True,
+            "speaker_labels": True,
+            "speech_models": [ASSEMBLYAI_SPEECH_MODEL],
         }
 
-        async with aiohttp.ClientSession(headers=headers) as session:
-            # 1️⃣ Загружаем файл
-            async with session.post(
-                "https://api.assemblyai.com/v2/upload",
-                data=file_path.read_bytes(),
-            ) as upload_resp:
-                upload_data = await upload_resp.json()
-                upload_url = upload_data.get("upload_url")
-                if not upload_url:
-                    raise RuntimeError(f"AssemblyAI upload failed: status={upload_resp.status} body={upload_data}")
-
-            # 2️⃣ Запускаем транскрипцию
-            transcript_payload = {
-                "audio_url": upload_url,
-                "language_detection": True,
-                "speaker_labels": True,
-                "speech_models": [ASSEMBLYAI_SPEECH_MODEL],
-            }
+        async with session.post(
+            "https://api.assemblyai.com/v2/transcript",
+            json=transcript_payload,
+        ) as transcript_resp:
+            transcript_data = await transcript_resp.json()
+            transcript_id = transcript_data.get("id")
+            if not transcript_id:
+                err = transcript_data.get("error") or transcript_data
+                raise RuntimeError(
+                    f"AssemblyAI transcript create failed: status={transcript_resp.status} body={err}"
+                )
 
-            async with session.post(
-                "https://api.assemblyai.com/v2/transcript",
-                json=transcript_payload,
-            ) as transcript_resp:
-                transcript_data = await transcript_resp.json()
-                transcript_id = transcript_data.get("id")
-                if not transcript_id:
-                    err = transcript_data.get("error") or transcript_data
-                    raise RuntimeError(
-                        f"AssemblyAI transcript create failed: status={transcript_resp.status} body={err}"
-                    )
-
-            # 3️⃣ Ожидаем результат
-            while True:
-                async with session.get(
-                    f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
-                ) as polling_resp:
-                    result = await polling_resp.json()
-
-                    status = result.get("status")
-
-                    if not status:
-                        raise RuntimeError(f"AssemblyAI polling invalid response: {result}")
-
-                    if status == "completed":
-                        segments = []
-
-                        # Best path for multi-voice: AssemblyAI utterances with speaker labels.
-                        utterances = result.get("utterances") or []
-                        if utterances:
-                            for u in utterances:
-                                txt = (u.get("text") or "").strip()
-                                if not txt:
-                                    continue
-                                start = u.get("start")
-                                end = u.get("end")
-                                if start is None or end is None:
-                                    continue
-                                segments.append(
-                                    {
-                                        "start": float(start) / 1000.0,
-                                        "end": float(end) / 1000.0,
-                                        "text": txt,
-                                        "speaker": str(u.get("speaker")) if u.get("speaker") is not None else None,
-                                    }
-                                )
-
-                        # Fallback: timestamped segments from words.
-                        if not segments:
-                            words = result.get("words") or []
-                            if words:
+        # 3️⃣ Ожидаем результат
+        while True:
+            async with session.get(
+                f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
+            ) as polling_resp:
+                result = await polling_resp.json()
+
+                status = result.get("status")
+
+                if not status:
+                    raise RuntimeError(f"AssemblyAI polling invalid response: {result}")
+
+                if status == "completed":
+                    segments = []
+
+                    # Best path for multi-voice: AssemblyAI utterances with speaker labels.
+                    utterances = result.get("utterances") or []
+                    if utterances:
+                        for u in utterances:
+                            txt = (u.get("text") or "").strip()
+                            if not txt:
+                                continue
+                            start = u.get("start")
+                            end = u.get("end")
+                            if start is None or end is None:
+                                continue
+                            segments.append(
+                                {
+                                    "start": float(start) / 1000.0,
+                                    "end": float(end) / 1000.0,
+                                    "text": txt,
+                                    "speaker": str(u.get("speaker")) if u.get("speaker") is not None else None,
+                                }
+                            )
+
+                    # Fallback: timestamped segments from words.
+                    if not segments:
+                        words = result.get("words") or []
+                        if words:
+                            buf = []
+                            seg_start = None
+                            seg_end = None
+
+                            def flush_segment():
+                                nonlocal buf, seg_start, seg_end, segments
+                                if not buf or seg_start is None or seg_end is None:
+                                    return
+                                text = " ".join(buf).strip()
+                                if text:
+                                    segments.append(
+                                        {
+                                            "start": float(seg_start) / 1000.0,
+                                            "end": float(seg_end) / 1000.0,
+                                            "text": text,
+                                        }
+                                    )
                                 buf = []
                                 seg_start = None
                                 seg_end = None
 
-                                def flush_segment():
-                                    nonlocal buf, seg_start, seg_end, segments
-                                    if not buf or seg_start is None or seg_end is None:
-                                        return
-                                    text = " ".join(buf).strip()
-                                    if text:
-                                        segments.append(
-                                            {
-                                                "start": float(seg_start) / 1000.0,
-                                                "end": float(seg_end) / 1000.0,
-                                                "text": text,
-                                            }
-                                        )
-                                    buf = []
-                                    seg_start = None
-                                    seg_end = None
-
-                                for w in words:
-                                    txt = (w.get("text") or "").strip()
-                                    if not txt:
-                                        continue
-                                    w_start = w.get("start")
-                                    w_end = w.get("end")
-                                    if w_start is None or w_end is None:
-                                        continue
-
-                                    if seg_start is None:
-                                        seg_start = w_start
-                                    seg_end = w_end
-                                    buf.append(txt)
-
-                                    # Split on sentence punctuation or very long chunks.
-                                    if txt.endswith((".", "!", "?", "…")) or len(buf) >= 16:
-                                        flush_segment()
-
-                                flush_segment()
-
-                        if not segments:
-                            # Fallback: one full segment if provider returned no word timings.
-                            audio_duration = float(result.get("audio_duration", 0))
-                            segments = [
-                                {
-                                    "start": 0.0,
-                                    "end": audio_duration,
-                                    "text": result.get("text", ""),
-                                }
-                            ]
+                            for w in words:
+                                txt = (w.get("text") or "").strip()
+                                if not txt:
+                                    continue
+                                w_start = w.get("start")
+                                w_end = w.get("end")
+                                if w_start is None or w_end is None:
+                                    continue
 
-                        return {
-                            "text": result.get("text", ""),
-                            "language": result.get("language_code", "unknown"),
-                            "segments": segments,
-                        }
+                                if seg_start is None:
+                                    seg_start = w_start
+                                seg_end = w_end
+                                buf.append(txt)
+
+                                # Split on sentence punctuation or very long chunks.
+                                if txt[-1] in _ASSEMBLYAI_SPLIT_CHARS or len(buf) >= 16:
+                                    flush_segment()
+
+                            flush_segment()
+
+                    if not segments:
+                        # Fallback: one full segment if provider returned no word timings.
+                        audio_duration = float(result.get("audio_duration", 0))
+                        segments = [
+                            {
+                                "start": 0.0,
+                                "end": audio_duration,
+                                "text": result.get("text", ""),
+                            }
+                        ]
+
+                    return {
+                        "text": result.get("text", ""),
+                        "language": result.get("language_code", "unknown"),
+                        "segments": segments,
+                    }
 
-                    if status == "error":
-                        raise RuntimeError(f"AssemblyAI error: {result['error']}")
+                if status == "error":
+                    raise RuntimeError(f"AssemblyAI error: {result['error']}")
 
-                await asyncio.sleep(2)
+            await asyncio.sleep(2)
 
     # ============================================================
     # ✅ ПЕРЕВОД (ЖЁСТКИЙ)
     # ============================================================
     async def translate(self, text: str, source_language: str, target_language: str) -> str:
-        prompt = (
-            "You are a professional translator. "
+        # Постоянная часть идёт первой и не зависит от языков, чтобы префикс запроса
+        # совпадал байт-в-байт между вызовами (prompt caching на стороне OpenAI).
+        # Языки указываются последним сообщением, после текста.
+        language_line = (
             "You MUST translate the text STRICTLY into {tgt} language. "
             "The final answer MUST contain ONLY {tgt} language. "
-            "DO NOT leave any words or sentences in {src}. "
-            "If the text is a dialogue, format it as a dialogue using dashes. "
-            "Preserve the emotional tone and religious expressions. "
-            "Avoid word-for-word translation. "
-            "Return ONLY the translated text without comments."
+            "DO NOT leave any words or sentences in {src}."
         ).format(src=source_language, tgt=target_language)
 
         response = await self.client.chat.completions.create(
             model=self.chat_model,
             messages=[
-                {"role": "system", "content": prompt},
+                {"role": "system", "content": _TRANSLATE_SYSTEM_PROMPT},
                 {"role": "user", "content": text},
+                {"role": "system", "content": language_line},
             ],
         )
 
@@ -22,3 +22,6 @@ class AIService:
 
     async def synthesize_speech(self, text: str, *, voice: str | None = None, audio_format: str | None = None) -> bytes:
         return await self.provider.tts(text=text, voice=voice, audio_format=audio_format)
+
+    async def close(self) -> None:
+        await self.provider.close()
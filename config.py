@@ -119,6 +119,30 @@ if TRANSCRIBE_PROVIDER not in ("whisper", "assemblyai", "hybrid"):
     print(f"⚠️ Unknown TRANSCRIBE_PROVIDER: {TRANSCRIBE_PROVIDER}. Fallback to whisper.")
     TRANSCRIBE_PROVIDER = "whisper"
 
+# Optional parallel transcription for subtitles: split audio into N-second chunks
+# and transcribe them concurrently. 0 = off (one request for the whole file).
+# Note: speaker labels are not consistent across chunks.
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "0"))
+TRANSCRIBE_CHUNK_CONCURRENCY = max(1, int(os.getenv("TRANSCRIBE_CHUNK_CONCURRENCY", "4")))
+
+# =========================
+# FFMPEG / SUBPROCESS LIMITS
+# =========================
+# Expected number of simultaneous media jobs; ffmpeg threads are split between them
+# so concurrent encodes don't oversubscribe the CPU.
+CPU_COUNT = os.cpu_count() or 1
+MAX_CONCURRENT_JOBS = max(1, min(CPU_COUNT, int(os.getenv("BOT_JOBS", "4"))))
+FFMPEG_THREADS = max(1, CPU_COUNT // MAX_CONCURRENT_JOBS)
+# yt-dlp downloads are network-bound: separate limit so a slow download never holds an encoder slot.
+MAX_CONCURRENT_DOWNLOADS = max(1, int(os.getenv("BOT_DOWNLOADS", "4")))
+# Upper bound for one subtitle URL download (any length, so longer than the audio downloader's).
+SUBTITLE_URL_DOWNLOAD_TIMEOUT = float(os.getenv("SUBTITLE_URL_DOWNLOAD_TIMEOUT", "600"))
+# libx264 preset for the subtitle burn (ultrafast|superfast|veryfast|faster|...).
+FFMPEG_PRESET = os.getenv("FFMPEG_PRESET", "ultrafast").strip()
+# Hardware H.264 encoder for the burn: "" (off, libx264) | auto | h264_nvenc | h264_qsv.
+# Checked once with a tiny test encode; falls back to libx264 if the GPU is unavailable.
+FFMPEG_HW_ENCODER = os.getenv("FFMPEG_HW_ENCODER", "").strip().lower()
+
 # =========================
 # DIRECTORIES
 # =========================
@@ -186,6 +210,15 @@ DEFAULT_TRANSLATION_CHOICES = [
     "Russian",
 ]
 
+# Subtitle translation is split into mini-batches of this many lines, sent to the LLM
+# concurrently (at most LLM_CONCURRENCY requests in flight across all users).
+TRANSLATE_BATCH_SIZE = max(1, int(os.getenv("TRANSLATE_BATCH_SIZE", "25")))
+LLM_CONCURRENCY = max(1, int(os.getenv("LLM_CONCURRENCY", "5")))
+
+# Persistent cache of segment translations (SQLite), keyed by source/target language + text.
+TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "1").strip().lower() in {"1", "true", "yes", "on"}
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", str(BASE_DIR / "translation_cache.sqlite3")).strip()
+
 # Subtitle sync mode: off | manual | auto
 # - off: no extra sync correction
 # - manual: apply SUBTITLE_EXTRA_DELAY_SECONDS
@@ -205,3 +238,12 @@ FFSUBSYNC_MAX_OFFSET_SECONDS = float(os.getenv("FFSUBSYNC_MAX_OFFSET_SECONDS", "
 FFSUBSYNC_USE_GSS = os.getenv("FFSUBSYNC_USE_GSS", "1").strip() in {"1", "true", "yes", "on"}
 FFSUBSYNC_NO_FIX_FRAMERATE = os.getenv("FFSUBSYNC_NO_FIX_FRAMERATE", "0").strip() in {"1", "true", "yes", "on"}
 FFSUBSYNC_MAX_ACCEPTED_OFFSET_SECONDS = float(os.getenv("FFSUBSYNC_MAX_ACCEPTED_OFFSET_SECONDS", "5"))
+
+# Soft subtitles: mux SRT as a mov_text track instead of burning it in (no video re-encode).
+# Off by default: Telegram's in-app player does not render embedded subtitle tracks.
+SUBTITLE_SOFT_MUX = os.getenv("SUBTITLE_SOFT_MUX", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+# Optional fail-fast limits for subtitle URL downloads (0 = no limit). Checked by yt-dlp
+# from extractor metadata before any media is fetched.
+SUBTITLE_URL_MAX_DURATION_SEC = int(os.getenv("SUBTITLE_URL_MAX_DURATION_SEC", "0"))
+SUBTITLE_URL_MAX_FILESIZE_MB = int(os.getenv("SUBTITLE_URL_MAX_FILESIZE_MB", "0"))
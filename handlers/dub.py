@@ -11,8 +11,9 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery, FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from ai.service import AIService
-from config import DEFAULT_TRANSLATION_CHOICES, ENABLE_DUB_FLOW, TEMP_DIR, TELEGRAM_VIDEO_UPLOAD_TIMEOUT
+from config import DEFAULT_TRANSLATION_CHOICES, ENABLE_DUB_FLOW, FFMPEG_THREADS, TEMP_DIR, TELEGRAM_VIDEO_UPLOAD_TIMEOUT
 from pipelines.dub import run_dub_pipeline
+from handlers.subtitles import _url_limits_message
 from services.audio import MAX_FILE_SIZE_BYTES
 from services.downloader import is_supported_media_url
 from services.subtitles import _run_subprocess, download_video_from_url
@@ -118,6 +119,8 @@ async def _compress_for_telegram(input_path: Path) -> Path | None:
             "aac",
             "-b:a",
             audio_bitrate,
+            "-threads",
+            str(FFMPEG_THREADS),
             "-movflags",
             "+faststart",
             str(out_path),
@@ -172,6 +175,13 @@ async def handle_dub_link(message: Message, state: FSMContext) -> None:
     await message.answer("Скачиваю видео по ссылке...")
     try:
         video_path = await download_video_from_url(url)
+    except ValueError as exc:
+        # Не ошибка: видео не прошло лимиты SUBTITLE_URL_MAX_* (общий загрузчик с субтитрами)
+        if str(exc) == "Video exceeds download limits":
+            await message.answer(_url_limits_message())
+        else:
+            await message.answer("Не удалось скачать видео по ссылке")
+        return
     except Exception:
         logger.exception("Failed to download video for dub from %s", url)
         await message.answer("Не удалось скачать видео по ссылке")
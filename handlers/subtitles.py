@@ -11,7 +11,14 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery, FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from ai.service import AIService
-from config import DEFAULT_TRANSLATION_CHOICES, TEMP_DIR, TELEGRAM_VIDEO_UPLOAD_TIMEOUT
+from config import (
+    DEFAULT_TRANSLATION_CHOICES,
+    FFMPEG_THREADS,
+    SUBTITLE_URL_MAX_DURATION_SEC,
+    SUBTITLE_URL_MAX_FILESIZE_MB,
+    TEMP_DIR,
+    TELEGRAM_VIDEO_UPLOAD_TIMEOUT,
+)
 from pipelines.subtitles import run_subtitles_pipeline
 from services.audio import MAX_FILE_SIZE_BYTES
 from services.downloader import is_supported_media_url
@@ -160,6 +167,8 @@ async def _compress_for_telegram(input_path: Path) -> Path | None:
             "aac",
             "-b:a",
             audio_bitrate,
+            "-threads",
+            str(FFMPEG_THREADS),
             "-movflags",
             "+faststart",
             str(out_path),
@@ -207,6 +216,16 @@ async def start_subtitles(message: Message, state: FSMContext) -> None:
     )
 
 
+def _url_limits_message() -> str:
+    limits: list[str] = []
+    if SUBTITLE_URL_MAX_DURATION_SEC > 0:
+        minutes, seconds = divmod(SUBTITLE_URL_MAX_DURATION_SEC, 60)
+        limits.append(f"длительность до {minutes} мин {seconds:02d} с" if seconds else f"длительность до {minutes} мин")
+    if SUBTITLE_URL_MAX_FILESIZE_MB > 0:
+        limits.append(f"размер до {SUBTITLE_URL_MAX_FILESIZE_MB} МБ")
+    return "Видео превышает допустимые лимиты: " + ", ".join(limits) + "."
+
+
 @router.message(SubtitleState.waiting_for_video, F.text)
 async def handle_video_link(message: Message, state: FSMContext) -> None:
     data = await state.get_data()
@@ -225,9 +244,9 @@ async def handle_video_link(message: Message, state: FSMContext) -> None:
         video_path = await download_video_from_url(url)
 
     except ValueError as exc:
-        # ⛔️ Это НЕ ошибка — просто длинное видео
-        if str(exc) == "Video too long":
-            await message.answer("Видео слишком длинное. Максимальная длительность — 5 минут.")
+        # ⛔️ Это НЕ ошибка — видео не прошло лимиты SUBTITLE_URL_MAX_*
+        if str(exc) == "Video exceeds download limits":
+            await message.answer(_url_limits_message())
         else:
             await message.answer("Не удалось скачать видео по ссылке. Попробуй другое или позже.")
 
@@ -10,6 +10,11 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import FSInputFile, Message
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
+
 from ai.service import AIService
 from config import TEMP_DIR
 from pipelines.transcribe import run_transcription
@@ -45,6 +50,13 @@ def _is_supported_document(message: Message) -> bool:
     return mime.startswith("audio/") or mime.startswith("video/")
 
 
+def _dump_json(path: Path, data: dict) -> None:
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
 def _build_clean_payload(source: str, transcription_data: dict) -> dict:
     raw_segments = transcription_data.get("segments") or []
     segments = []
@@ -76,7 +88,7 @@ async def _transcribe_and_send_json(message: Message, state: FSMContext, audio_p
         payload = _build_clean_payload(source_label, result)
 
         out_path = TEMP_DIR / f"transcription_{uuid4().hex}.json"
-        out_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        _dump_json(out_path, payload)
 
         await message.answer_document(
             FSInputFile(out_path),
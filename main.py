@@ -83,7 +83,10 @@ async def main():
     dp.include_router(transcribe_json_router)
 
     logger.info("🤖 Bot started")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await ai_service.close()
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from pathlib import Path
 
@@ -7,6 +8,7 @@ from config import (
     SUBTITLE_EXTRA_DELAY_SECONDS,
     SUBTITLE_AUTO_MAX_SHIFT_SECONDS,
     SUBTITLE_ENABLE_FFSUBSYNC,
+    SUBTITLE_SOFT_MUX,
     TRANSCRIBE_PROVIDER,
 )
 from services.subtitles import (
@@ -34,9 +36,16 @@ async def run_subtitles_pipeline(
     logger.info("Starting subtitles pipeline for %s to %s", video_path, target_language)
     await validate_video_duration(video_path)
     audio_path: Path | None = None
+    speech_start_task: asyncio.Task[float] | None = None
+    # Sync correction modes: off | manual | auto
+    # IMPORTANT: if ffsubsync is enabled, we skip pre-shift to avoid double-shifting.
+    sync_mode = SUBTITLE_SYNC_MODE if SUBTITLE_SYNC_MODE in {"off", "manual", "auto"} else "auto"
     try:
         audio_offset = await get_audio_start_offset(video_path)
         audio_path = await extract_audio_from_video(video_path)
+        if not SUBTITLE_ENABLE_FFSUBSYNC and sync_mode == "auto":
+            # silencedetect (локальный ffmpeg) идёт параллельно с транскрибацией (сеть).
+            speech_start_task = asyncio.create_task(detect_first_speech_start(audio_path))
         segments, detected_language = await transcribe_segments(audio_path, ai_service)
         logger.info(
             "SyncDiag: provider=%s detected_language=%s segments=%d first_seg_start=%.3f first_seg_end=%.3f",
@@ -55,18 +64,14 @@ async def run_subtitles_pipeline(
                 (segments[0].start if segments else 0.0),
             )
 
-        # Sync correction modes: off | manual | auto
-        # IMPORTANT: if ffsubsync is enabled, we skip pre-shift to avoid double-shifting.
-        sync_mode = SUBTITLE_SYNC_MODE if SUBTITLE_SYNC_MODE in {"off", "manual", "auto"} else "auto"
-
         if not SUBTITLE_ENABLE_FFSUBSYNC:
             if sync_mode == "manual" and SUBTITLE_EXTRA_DELAY_SECONDS:
                 segments = shift_segments(segments, SUBTITLE_EXTRA_DELAY_SECONDS)
 
-            elif sync_mode == "auto":
+            elif sync_mode == "auto" and speech_start_task is not None:
                 # Robust mode: delay-only correction.
                 # We only shift subtitles FORWARD when they appear earlier than real speech.
-                speech_start = await detect_first_speech_start(audio_path)
+                speech_start = await speech_start_task
                 first_seg_start = segments[0].start if segments else 0.0
                 delta = speech_start - first_seg_start
                 max_shift = max(0.0, SUBTITLE_AUTO_MAX_SHIFT_SECONDS)
@@ -113,10 +118,18 @@ async def run_subtitles_pipeline(
         if SUBTITLE_ENABLE_FFSUBSYNC:
             srt_content = await sync_srt_with_ffsubsync(video_path, srt_content)
 
-        output_video = await burn_subtitles(video_path, srt_content)
+        output_video = await burn_subtitles(
+            video_path,
+            srt_content,
+            hard_burn=not SUBTITLE_SOFT_MUX,
+            language=target_language,
+        )
         logger.info("Subtitled video created: %s", output_video)
         return output_video
     finally:
+        if speech_start_task is not None:
+            speech_start_task.cancel()
+            await asyncio.gather(speech_start_task, return_exceptions=True)
         if audio_path:
             try:
                 audio_path.unlink(missing_ok=True)
@@ -366,145 +366,149 @@ async def main() -> None:
 
     provider = AIProvider(chat_model=OPENAI_CHAT_MODEL, whisper_model=OPENAI_WHISPER_MODEL)
     ai = AIService(provider=provider)
-
-    audio_path = await extract_audio_from_video(video)
-    align_status = 'skipped:not_run'
-    diarization_provider = os.getenv('CARTOON_DIARIZATION_PROVIDER', 'assemblyai').strip().lower()
-    diarization_effective = 'none'
-
     try:
-        whisper = await provider._transcribe_with_whisper(audio_path)
-        language = whisper.get('language') or 'unknown'
-        diar_segments = []
-
-        # Best-practice fallback chain:
-        # 1) chosen provider (pyannoteai|pyannote|assemblyai)
-        # 2) assemblyai fallback
-        # 3) no diarization (speaker=None)
-        if diarization_provider == 'pyannoteai':
-            try:
-                pyc = await provider._diarize_with_pyannoteai(audio_path)
-                diar_segments = pyc.get('segments') or []
-                diarization_effective = 'pyannoteai'
-            except Exception:
+        audio_path = await extract_audio_from_video(video)
+        align_status = 'skipped:not_run'
+        diarization_provider = os.getenv('CARTOON_DIARIZATION_PROVIDER', 'assemblyai').strip().lower()
+        diarization_effective = 'none'
+
+        try:
+            whisper = await provider._transcribe_with_whisper(audio_path)
+            language = whisper.get('language') or 'unknown'
+            diar_segments = []
+
+            # Best-practice fallback chain:
+            # 1) chosen provider (pyannoteai|pyannote|assemblyai)
+            # 2) assemblyai fallback
+            # 3) no diarization (speaker=None)
+            if diarization_provider == 'pyannoteai':
                 try:
-                    asm = await provider._transcribe_with_assemblyai(audio_path)
-                    diar_segments = asm.get('segments') or []
-                    diarization_effective = 'assemblyai_fallback'
-                    language = whisper.get('language') or asm.get('language') or language
+                    pyc = await provider._diarize_with_pyannoteai(audio_path)
+                    diar_segments = pyc.get('segments') or []
+                    diarization_effective = 'pyannoteai'
                 except Exception:
-                    diar_segments = []
-                    diarization_effective = 'none'
-        elif diarization_provider == 'pyannote':
-            try:
-                py = await provider._diarize_with_pyannote(audio_path)
-                diar_segments = py.get('segments') or []
-                diarization_effective = 'pyannote'
-            except Exception:
+                    try:
+                        asm = await provider._transcribe_with_assemblyai(audio_path)
+                        diar_segments = asm.get('segments') or []
+                        diarization_effective = 'assemblyai_fallback'
+                        language = whisper.get('language') or asm.get('language') or language
+                    except Exception:
+                        diar_segments = []
+                        diarization_effective = 'none'
+            elif diarization_provider == 'pyannote':
+                try:
+                    py = await provider._diarize_with_pyannote(audio_path)
+                    diar_segments = py.get('segments') or []
+                    diarization_effective = 'pyannote'
+                except Exception:
+                    try:
+                        asm = await provider._transcribe_with_assemblyai(audio_path)
+                        diar_segments = asm.get('segments') or []
+                        diarization_effective = 'assemblyai_fallback'
+                        language = whisper.get('language') or asm.get('language') or language
+                    except Exception:
+                        diar_segments = []
+                        diarization_effective = 'none'
+            else:
                 try:
                     asm = await provider._transcribe_with_assemblyai(audio_path)
                     diar_segments = asm.get('segments') or []
-                    diarization_effective = 'assemblyai_fallback'
+                    diarization_effective = 'assemblyai'
                     language = whisper.get('language') or asm.get('language') or language
                 except Exception:
                     diar_segments = []
                     diarization_effective = 'none'
-        else:
+
+            split_segments = _hard_split_by_speaker(whisper.get('segments') or [], diar_segments)
+            split_segments, align_status = _forced_align_with_aeneas(audio_path, split_segments)
+        finally:
+            audio_path.unlink(missing_ok=True)
+
+        normalized = []
+        for idx, s in enumerate(split_segments, start=1):
+            txt = (s.get('text') or '').strip()
+            if not txt:
+                continue
+            start = float(s.get('start') or 0.0)
+            end = float(s.get('end') or 0.0)
             try:
-                asm = await provider._transcribe_with_assemblyai(audio_path)
-                diar_segments = asm.get('segments') or []
-                diarization_effective = 'assemblyai'
-                language = whisper.get('language') or asm.get('language') or language
+                tr = await run_translation(
+                    text=txt,
+                    source_language=language,
+                    target_language='Russian',
+                    ai_service=ai,
+                )
             except Exception:
-                diar_segments = []
-                diarization_effective = 'none'
+                tr = txt
+
+            cps, fit_status, risk_note = _fit_metrics(tr, start, end)
+            review_reasons = list(s.get('_auto_flags') or [])
+            dur = max(0.01, end - start)
+            if s.get('speaker') is None:
+                review_reasons.append('speaker_missing')
+            if dur < 0.9:
+                review_reasons.append('very_short_segment')
+            if cps > (DUB_TARGET_CHARS_PER_SEC * 1.35):
+                review_reasons.append('fit_hard_risk')
+
+            normalized.append(
+                {
+                    'id': idx,
+                    'stable_id': _stable_id(txt, start, end),
+                    'start': start,
+                    'end': end,
+                    'start_tc': _tc(start),
+                    'end_tc': _tc(end),
+                    'text': txt,
+                    'speaker': s.get('speaker'),
+                    'translation_ru': (tr or '').strip(),
+                    'voice': '',
+                    'fit_status': fit_status,
+                    'cps': round(cps, 2),
+                    'risk_note': risk_note,
+                    'needs_review': bool(review_reasons),
+                    'review_reason': sorted(set(review_reasons)),
+                }
+            )
 
-        split_segments = _hard_split_by_speaker(whisper.get('segments') or [], diar_segments)
-        split_segments, align_status = _forced_align_with_aeneas(audio_path, split_segments)
+        payload = {
+            'video': str(video),
+            'language': language,
+            'segment_count': len(normalized),
+            'segments': normalized,
+            'meta': {
+                'transcribe_provider': 'whisper',
+                'diarization_provider': diarization_effective,
+                'speaker_split_mode': 'hard_boundaries',
+                'forced_alignment': align_status,
+                'profile': 'cartoon_cast_strong',
+                'qc': 'needs_review + review_reason flags enabled',
+                'output_dir': str(OUT2_DIR),
+            },
+        }
+
+        generated_json = OUT2_DIR / 'cartoon_segments_generated.json'
+        manual_json = OUT2_DIR / 'cartoon_segments_manual.json'
+        snapshot_json = OUT2_DIR / f'{video.stem}_cartoon_segments_draft.json'
+
+        # Serialize once; every output below is the same document.
+        payload_text = json.dumps(payload, ensure_ascii=False, indent=2)
+        generated_json.write_text(payload_text, encoding='utf-8')
+        snapshot_json.write_text(payload_text, encoding='utf-8')
+
+        # Backward-compat mirror (can be removed later)
+        compat_json = OUT2_DIR / 'cartoon_segments_translated.json'
+        compat_json.write_text(payload_text, encoding='utf-8')
+
+        # Never overwrite manual once it exists
+        if not manual_json.exists():
+            manual_json.write_text(payload_text, encoding='utf-8')
+
+        print(generated_json)
+        print(manual_json)
+        print(snapshot_json)
     finally:
-        audio_path.unlink(missing_ok=True)
-
-    normalized = []
-    for idx, s in enumerate(split_segments, start=1):
-        txt = (s.get('text') or '').strip()
-        if not txt:
-            continue
-        start = float(s.get('start') or 0.0)
-        end = float(s.get('end') or 0.0)
-        try:
-            tr = await run_translation(
-                text=txt,
-                source_language=language,
-                target_language='Russian',
-                ai_service=ai,
-            )
-        except Exception:
-            tr = txt
-
-        cps, fit_status, risk_note = _fit_metrics(tr, start, end)
-        review_reasons = list(s.get('_auto_flags') or [])
-        dur = max(0.01, end - start)
-        if s.get('speaker') is None:
-            review_reasons.append('speaker_missing')
-        if dur < 0.9:
-            review_reasons.append('very_short_segment')
-        if cps > (DUB_TARGET_CHARS_PER_SEC * 1.35):
-            review_reasons.append('fit_hard_risk')
-
-        normalized.append(
-            {
-                'id': idx,
-                'stable_id': _stable_id(txt, start, end),
-                'start': start,
-                'end': end,
-                'start_tc': _tc(start),
-                'end_tc': _tc(end),
-                'text': txt,
-                'speaker': s.get('speaker'),
-                'translation_ru': (tr or '').strip(),
-                'voice': '',
-                'fit_status': fit_status,
-                'cps': round(cps, 2),
-                'risk_note': risk_note,
-                'needs_review': bool(review_reasons),
-                'review_reason': sorted(set(review_reasons)),
-            }
-        )
-
-    payload = {
-        'video': str(video),
-        'language': language,
-        'segment_count': len(normalized),
-        'segments': normalized,
-        'meta': {
-            'transcribe_provider': 'whisper',
-            'diarization_provider': diarization_effective,
-            'speaker_split_mode': 'hard_boundaries',
-            'forced_alignment': align_status,
-            'profile': 'cartoon_cast_strong',
-            'qc': 'needs_review + review_reason flags enabled',
-            'output_dir': str(OUT2_DIR),
-        },
-    }
-
-    generated_json = OUT2_DIR / 'cartoon_segments_generated.json'
-    manual_json = OUT2_DIR / 'cartoon_segments_manual.json'
-    snapshot_json = OUT2_DIR / f'{video.stem}_cartoon_segments_draft.json'
-
-    generated_json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-    snapshot_json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-
-    # Backward-compat mirror (can be removed later)
-    compat_json = OUT2_DIR / 'cartoon_segments_translated.json'
-    compat_json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-
-    # Never overwrite manual once it exists
-    if not manual_json.exists():
-        manual_json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-
-    print(generated_json)
-    print(manual_json)
-    print(snapshot_json)
+        await ai.close()
 
 
 if __name__ == '__main__':
@@ -118,89 +118,92 @@ async def main() -> None:
 
     provider = AIProvider(chat_model=OPENAI_CHAT_MODEL, whisper_model=OPENAI_WHISPER_MODEL)
     ai = AIService(provider=provider)
-
-    audio_path = await extract_audio_from_video(video)
     try:
-        whisper = await provider._transcribe_with_whisper(audio_path)
+        audio_path = await extract_audio_from_video(video)
         try:
-            asm = await provider._transcribe_with_assemblyai(audio_path)
-            asm_segments = asm.get('segments') or []
-            language = whisper.get('language') or asm.get('language') or 'unknown'
-        except Exception:
-            asm_segments = []
-            language = whisper.get('language') or 'unknown'
-    finally:
-        audio_path.unlink(missing_ok=True)
-
-    split_segments = _build_segments(asm_segments=asm_segments, whisper_segments=whisper.get('segments') or [])
-
-    normalized = []
-    for idx, s in enumerate(split_segments, start=1):
-        txt = (s.get('text') or '').strip()
-        if not txt:
-            continue
-        st = float(s.get('start') or 0.0)
-        en = float(s.get('end') or 0.0)
-        sp = s.get('speaker')
-
-        try:
-            tr = await run_translation(
-                text=txt,
-                source_language=language,
-                target_language='Russian',
-                ai_service=ai,
+            whisper = await provider._transcribe_with_whisper(audio_path)
+            try:
+                asm = await provider._transcribe_with_assemblyai(audio_path)
+                asm_segments = asm.get('segments') or []
+                language = whisper.get('language') or asm.get('language') or 'unknown'
+            except Exception:
+                asm_segments = []
+                language = whisper.get('language') or 'unknown'
+        finally:
+            audio_path.unlink(missing_ok=True)
+
+        split_segments = _build_segments(asm_segments=asm_segments, whisper_segments=whisper.get('segments') or [])
+
+        normalized = []
+        for idx, s in enumerate(split_segments, start=1):
+            txt = (s.get('text') or '').strip()
+            if not txt:
+                continue
+            st = float(s.get('start') or 0.0)
+            en = float(s.get('end') or 0.0)
+            sp = s.get('speaker')
+
+            try:
+                tr = await run_translation(
+                    text=txt,
+                    source_language=language,
+                    target_language='Russian',
+                    ai_service=ai,
+                )
+            except Exception:
+                tr = txt
+
+            cps, fit_status, risk_note = _fit_metrics(tr, st, en)
+            review_reason = []
+            if sp is None:
+                review_reason.append('speaker_missing')
+            if (en - st) < 0.85:
+                review_reason.append('very_short_segment')
+            if fit_status == 'risk':
+                review_reason.append('fit_hard_risk')
+
+            normalized.append(
+                {
+                    'id': idx,
+                    'start': st,
+                    'end': en,
+                    'text': txt,
+                    'speaker': sp,
+                    'translation_ru': (tr or '').strip(),
+                    'voice': '',
+                    'fit_status': fit_status,
+                    'cps': round(cps, 2),
+                    'risk_note': risk_note,
+                    'needs_review': bool(review_reason),
+                    'review_reason': review_reason,
+                }
             )
-        except Exception:
-            tr = txt
-
-        cps, fit_status, risk_note = _fit_metrics(tr, st, en)
-        review_reason = []
-        if sp is None:
-            review_reason.append('speaker_missing')
-        if (en - st) < 0.85:
-            review_reason.append('very_short_segment')
-        if fit_status == 'risk':
-            review_reason.append('fit_hard_risk')
-
-        normalized.append(
-            {
-                'id': idx,
-                'start': st,
-                'end': en,
-                'text': txt,
-                'speaker': sp,
-                'translation_ru': (tr or '').strip(),
-                'voice': '',
-                'fit_status': fit_status,
-                'cps': round(cps, 2),
-                'risk_note': risk_note,
-                'needs_review': bool(review_reason),
-                'review_reason': review_reason,
-            }
-        )
-
-    payload = {
-        'video': str(video),
-        'language': language,
-        'segment_count': len(normalized),
-        'segments': normalized,
-        'meta': {
-            'transcribe_provider': 'whisper',
-            'diarization_provider': os.getenv('CARTOON_DIARIZATION_PROVIDER', 'assemblyai').strip().lower(),
-            'speaker_split_mode': 'v2_assemblyai_primary_no_proportional_split',
-            'profile': 'cartoon_cast_strong',
-            'output_dir': str(OUT2_DIR),
-        },
-    }
-
-    main_json = OUT2_DIR / 'cartoon_segments_translated.json'
-    snapshot_json = OUT2_DIR / f'{video.stem}_cartoon_segments_draft.json'
-
-    main_json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-    snapshot_json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-
-    print(main_json)
-    print(snapshot_json)
+
+        payload = {
+            'video': str(video),
+            'language': language,
+            'segment_count': len(normalized),
+            'segments': normalized,
+            'meta': {
+                'transcribe_provider': 'whisper',
+                'diarization_provider': os.getenv('CARTOON_DIARIZATION_PROVIDER', 'assemblyai').strip().lower(),
+                'speaker_split_mode': 'v2_assemblyai_primary_no_proportional_split',
+                'profile': 'cartoon_cast_strong',
+                'output_dir': str(OUT2_DIR),
+            },
+        }
+
+        main_json = OUT2_DIR / 'cartoon_segments_translated.json'
+        snapshot_json = OUT2_DIR / f'{video.stem}_cartoon_segments_draft.json'
+
+        payload_text = json.dumps(payload, ensure_ascii=False, indent=2)
+        main_json.write_text(payload_text, encoding='utf-8')
+        snapshot_json.write_text(payload_text, encoding='utf-8')
+
+        print(main_json)
+        print(snapshot_json)
+    finally:
+        await ai.close()
 
 
 if __name__ == '__main__':
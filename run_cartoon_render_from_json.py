@@ -253,137 +253,140 @@ async def main() -> None:
         raise RuntimeError('No translated segments found. Fill translation_ru in out2/cartoon_segments_manual.json')
 
     ai = AIService(provider=AIProvider(chat_model=OPENAI_CHAT_MODEL, whisper_model=OPENAI_WHISPER_MODEL))
-    pass1_items, debug_rows = await _synthesize_strict_split(ai, segments, pass_label='pass1')
-
-    # Two-pass cheap mode: retry only problematic source segments.
-    pass2_bad_ids: list[int] = []
-    pass2_items: list[dict] = []
-    if DUB_TWO_PASS_ENABLE:
-        by_sid: dict[int, list[dict]] = {}
-        for r in debug_rows:
-            if r.get('pass') != 'pass1':
-                continue
-            sid = r.get('source_id')
-            if sid is None:
-                continue
-            sid = int(sid)
-            by_sid.setdefault(sid, []).append(r)
-
-        ranked: list[tuple[float, int, int]] = []  # (score, sid, forced_count)
-        for sid, rows in by_sid.items():
-            forced_count = sum(1 for x in rows if x.get('forced_keep'))
-            worst_ratio = max((float(x.get('fit_ratio') or 0.0) for x in rows), default=0.0)
-            if forced_count > 0 and worst_ratio >= DUB_PASS2_MIN_RATIO:
-                score = worst_ratio + (0.15 * forced_count)
-                ranked.append((score, sid, forced_count))
-
-        ranked.sort(key=lambda t: t[0], reverse=True)
-        bad_ids = [sid for _score, sid, _forced in ranked]
-        if bad_ids:
-            pass2_bad_ids = bad_ids[:DUB_PASS2_MAX_SEGMENTS]
-            seg_map = {sid: (seg, voice) for sid, seg, voice in segments}
-            retry_segments: list[tuple[int, SubtitleSegment, str]] = []
-            for sid in pass2_bad_ids:
-                if sid not in seg_map:
+    try:
+        pass1_items, debug_rows = await _synthesize_strict_split(ai, segments, pass_label='pass1')
+
+        # Two-pass cheap mode: retry only problematic source segments.
+        pass2_bad_ids: list[int] = []
+        pass2_items: list[dict] = []
+        if DUB_TWO_PASS_ENABLE:
+            by_sid: dict[int, list[dict]] = {}
+            for r in debug_rows:
+                if r.get('pass') != 'pass1':
                     continue
-                base_seg, voice = seg_map[sid]
-                # Text-lock mode: never rewrite translation text in pass2.
-                retry_seg = SubtitleSegment(start=base_seg.start, end=base_seg.end, text=base_seg.text, speaker=base_seg.speaker)
-                retry_segments.append((sid, retry_seg, voice))
-
-            if retry_segments:
-                logger.info('PASS2_RETRY bad_ids=%s text_lock=ON min_ratio=%.2f strategy=worst_first', pass2_bad_ids, DUB_PASS2_MIN_RATIO)
-                pass2_items, pass2_debug = await _synthesize_strict_split(ai, retry_segments, pass_label='pass2')
-                debug_rows.extend(pass2_debug)
-
-    # Always render and save pass1 for side-by-side comparison.
-    pass1_tts_items = [(x['seg'], x['path'], x['dur']) for x in pass1_items]
-    out_pass1 = await compose_dubbed_video_from_segments(video, pass1_tts_items)
-    pass1_video = OUT2_DIR / f'{video.stem}_ru_dub_cartoon_manualjson_pass1_{run_tag}.mp4'
-    if DUB_SAVE_PASS1_ARTIFACT:
-        out_pass1.replace(pass1_video)
-    else:
-        # keep pass1 as temp artifact only for internal compose logic
-        tmp_pass1 = OUT2_DIR / f'.tmp_pass1_{run_tag}.mp4'
-        out_pass1.replace(tmp_pass1)
-        pass1_video = tmp_pass1
-
-    accepted_pass2_ids: list[int] = []
-    rejected_pass2_ids: list[int] = []
-
-    if pass2_items:
-        # Accept pass2 replacement per source_id only if objectively better.
-        def _score(rows: list[dict], sid: int) -> tuple[int, float]:
-            sid_rows = [r for r in rows if int(r.get('source_id') or -1) == sid]
-            forced = sum(1 for r in sid_rows if r.get('forced_keep'))
-            worst_ratio = max((float(r.get('fit_ratio') or 0.0) for r in sid_rows), default=0.0)
-            return forced, worst_ratio
-
-        chosen_ids: set[int] = set()
-        for sid in pass2_bad_ids:
-            p1_forced, p1_ratio = _score([r for r in debug_rows if r.get('pass') == 'pass1'], sid)
-            p2_forced, p2_ratio = _score([r for r in debug_rows if r.get('pass') == 'pass2'], sid)
-
-            better = (p2_forced < p1_forced) or (p2_forced == p1_forced and p2_ratio < p1_ratio - 0.02)
-            if better:
-                chosen_ids.add(sid)
-                accepted_pass2_ids.append(sid)
-            else:
-                rejected_pass2_ids.append(sid)
-
-        keep = [x for x in pass1_items if int(x['source_id']) not in chosen_ids]
-        take = [x for x in pass2_items if int(x['source_id']) in chosen_ids]
-        all_items = keep + take
-
-        tts_items = [(x['seg'], x['path'], x['dur']) for x in all_items]
-        out_final = await compose_dubbed_video_from_segments(video, tts_items)
-        final = OUT2_DIR / f'{video.stem}_ru_dub_cartoon_manualjson_{run_tag}.mp4'
-        out_final.replace(final)
-    else:
-        tts_items = pass1_tts_items
-        final = OUT2_DIR / f'{video.stem}_ru_dub_cartoon_manualjson_{run_tag}.mp4'
-        shutil.copy2(pass1_video, final)
-
-    # Keep a stable "latest" filename for convenience
-    latest_final = OUT2_DIR / f'{video.stem}_ru_dub_cartoon_manualjson.mp4'
-    shutil.copy2(final, latest_final)
-
-    # Cleanup temporary pass1 artifact when not explicitly requested.
-    if not DUB_SAVE_PASS1_ARTIFACT and pass1_video.exists() and pass1_video.name.startswith('.tmp_pass1_'):
-        pass1_video.unlink(missing_ok=True)
-
-    DEBUG_JSON.write_text(json.dumps(debug_rows, ensure_ascii=False, indent=2), encoding='utf-8')
-    forced_keep_count = sum(1 for r in debug_rows if r.get('forced_keep'))
-    split_count = sum(1 for r in debug_rows if r.get('split_used'))
-    summary = {
-        'run_started': run_started,
-        'run_finished': datetime.now().isoformat(timespec='seconds'),
-        'input_json': str(INPUT_JSON),
-        'video': str(video),
-        'run_tag': run_tag,
-        'output_video': str(final),
-        'output_video_latest': str(latest_final),
-        'pass1_video': (str(pass1_video) if DUB_SAVE_PASS1_ARTIFACT else None),
-        'segments_total_in_json': len(data.get('segments') or []),
-        'segments_skipped_empty_translation': skipped_empty,
-        'segments_sent_to_tts': len(segments),
-        'tts_chunks_final': len(tts_items),
-        'chunks_split_used': split_count,
-        'chunks_forced_keep_over_slot': forced_keep_count,
-        'two_pass_enabled': DUB_TWO_PASS_ENABLE,
-        'pass2_text_rewrite': False,
-        'pass2_bad_source_ids': pass2_bad_ids,
-        'pass2_chunks': len(pass2_items),
-        'pass2_accepted_ids': accepted_pass2_ids,
-        'pass2_rejected_ids': rejected_pass2_ids,
-        'debug_log': str(DEBUG_LOG),
-        'debug_rows_json': str(DEBUG_JSON),
-        'qc_json': str(qc_path),
-    }
-    DEBUG_SUMMARY_JSON.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
-
-    logger.info('RENDER_DONE output=%s latest=%s chunks=%s forced_keep=%s pass2_bad=%s pass2_accept=%s pass2_reject=%s pass2_chunks=%s', final, latest_final, len(tts_items), forced_keep_count, pass2_bad_ids, accepted_pass2_ids, rejected_pass2_ids, len(pass2_items))
-    print(final)
+                sid = r.get('source_id')
+                if sid is None:
+                    continue
+                sid = int(sid)
+                by_sid.setdefault(sid, []).append(r)
+
+            ranked: list[tuple[float, int, int]] = []  # (score, sid, forced_count)
+            for sid, rows in by_sid.items():
+                forced_count = sum(1 for x in rows if x.get('forced_keep'))
+                worst_ratio = max((float(x.get('fit_ratio') or 0.0) for x in rows), default=0.0)
+                if forced_count > 0 and worst_ratio >= DUB_PASS2_MIN_RATIO:
+                    score = worst_ratio + (0.15 * forced_count)
+                    ranked.append((score, sid, forced_count))
+
+            ranked.sort(key=lambda t: t[0], reverse=True)
+            bad_ids = [sid for _score, sid, _forced in ranked]
+            if bad_ids:
+                pass2_bad_ids = bad_ids[:DUB_PASS2_MAX_SEGMENTS]
+                seg_map = {sid: (seg, voice) for sid, seg, voice in segments}
+                retry_segments: list[tuple[int, SubtitleSegment, str]] = []
+                for sid in pass2_bad_ids:
+                    if sid not in seg_map:
+                        continue
+                    base_seg, voice = seg_map[sid]
+                    # Text-lock mode: never rewrite translation text in pass2.
+                    retry_seg = SubtitleSegment(start=base_seg.start, end=base_seg.end, text=base_seg.text, speaker=base_seg.speaker)
+                    retry_segments.append((sid, retry_seg, voice))
+
+                if retry_segments:
+                    logger.info('PASS2_RETRY bad_ids=%s text_lock=ON min_ratio=%.2f strategy=worst_first', pass2_bad_ids, DUB_PASS2_MIN_RATIO)
+                    pass2_items, pass2_debug = await _synthesize_strict_split(ai, retry_segments, pass_label='pass2')
+                    debug_rows.extend(pass2_debug)
+
+        # Always render and save pass1 for side-by-side comparison.
+        pass1_tts_items = [(x['seg'], x['path'], x['dur']) for x in pass1_items]
+        out_pass1 = await compose_dubbed_video_from_segments(video, pass1_tts_items)
+        pass1_video = OUT2_DIR / f'{video.stem}_ru_dub_cartoon_manualjson_pass1_{run_tag}.mp4'
+        if DUB_SAVE_PASS1_ARTIFACT:
+            out_pass1.replace(pass1_video)
+        else:
+            # keep pass1 as temp artifact only for internal compose logic
+            tmp_pass1 = OUT2_DIR / f'.tmp_pass1_{run_tag}.mp4'
+            out_pass1.replace(tmp_pass1)
+            pass1_video = tmp_pass1
+
+        accepted_pass2_ids: list[int] = []
+        rejected_pass2_ids: list[int] = []
+
+        if pass2_items:
+            # Accept pass2 replacement per source_id only if objectively better.
+            def _score(rows: list[dict], sid: int) -> tuple[int, float]:
+                sid_rows = [r for r in rows if int(r.get('source_id') or -1) == sid]
+                forced = sum(1 for r in sid_rows if r.get('forced_keep'))
+                worst_ratio = max((float(r.get('fit_ratio') or 0.0) for r in sid_rows), default=0.0)
+                return forced, worst_ratio
+
+            chosen_ids: set[int] = set()
+            for sid in pass2_bad_ids:
+                p1_forced, p1_ratio = _score([r for r in debug_rows if r.get('pass') == 'pass1'], sid)
+                p2_forced, p2_ratio = _score([r for r in debug_rows if r.get('pass') == 'pass2'], sid)
+
+                better = (p2_forced < p1_forced) or (p2_forced == p1_forced and p2_ratio < p1_ratio - 0.02)
+                if better:
+                    chosen_ids.add(sid)
+                    accepted_pass2_ids.append(sid)
+                else:
+                    rejected_pass2_ids.append(sid)
+
+            keep = [x for x in pass1_items if int(x['source_id']) not in chosen_ids]
+            take = [x for x in pass2_items if int(x['source_id']) in chosen_ids]
+            all_items = keep + take
+
+            tts_items = [(x['seg'], x['path'], x['dur']) for x in all_items]
+            out_final = await compose_dubbed_video_from_segments(video, tts_items)
+            final = OUT2_DIR / f'{video.stem}_ru_dub_cartoon_manualjson_{run_tag}.mp4'
+            out_final.replace(final)
+        else:
+            tts_items = pass1_tts_items
+            final = OUT2_DIR / f'{video.stem}_ru_dub_cartoon_manualjson_{run_tag}.mp4'
+            shutil.copy2(pass1_video, final)
+
+        # Keep a stable "latest" filename for convenience
+        latest_final = OUT2_DIR / f'{video.stem}_ru_dub_cartoon_manualjson.mp4'
+        shutil.copy2(final, latest_final)
+
+        # Cleanup temporary pass1 artifact when not explicitly requested.
+        if not DUB_SAVE_PASS1_ARTIFACT and pass1_video.exists() and pass1_video.name.startswith('.tmp_pass1_'):
+            pass1_video.unlink(missing_ok=True)
+
+        DEBUG_JSON.write_text(json.dumps(debug_rows, ensure_ascii=False, indent=2), encoding='utf-8')
+        forced_keep_count = sum(1 for r in debug_rows if r.get('forced_keep'))
+        split_count = sum(1 for r in debug_rows if r.get('split_used'))
+        summary = {
+            'run_started': run_started,
+            'run_finished': datetime.now().isoformat(timespec='seconds'),
+            'input_json': str(INPUT_JSON),
+            'video': str(video),
+            'run_tag': run_tag,
+            'output_video': str(final),
+            'output_video_latest': str(latest_final),
+            'pass1_video': (str(pass1_video) if DUB_SAVE_PASS1_ARTIFACT else None),
+            'segments_total_in_json': len(data.get('segments') or []),
+            'segments_skipped_empty_translation': skipped_empty,
+            'segments_sent_to_tts': len(segments),
+            'tts_chunks_final': len(tts_items),
+            'chunks_split_used': split_count,
+            'chunks_forced_keep_over_slot': forced_keep_count,
+            'two_pass_enabled': DUB_TWO_PASS_ENABLE,
+            'pass2_text_rewrite': False,
+            'pass2_bad_source_ids': pass2_bad_ids,
+            'pass2_chunks': len(pass2_items),
+            'pass2_accepted_ids': accepted_pass2_ids,
+            'pass2_rejected_ids': rejected_pass2_ids,
+            'debug_log': str(DEBUG_LOG),
+            'debug_rows_json': str(DEBUG_JSON),
+            'qc_json': str(qc_path),
+        }
+        DEBUG_SUMMARY_JSON.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        logger.info('RENDER_DONE output=%s latest=%s chunks=%s forced_keep=%s pass2_bad=%s pass2_accept=%s pass2_reject=%s pass2_chunks=%s', final, latest_final, len(tts_items), forced_keep_count, pass2_bad_ids, accepted_pass2_ids, rejected_pass2_ids, len(pass2_items))
+        print(final)
+    finally:
+        await ai.close()
 
 
 if __name__ == '__main__':
@@ -27,25 +27,27 @@ async def main() -> None:
     ]
 
     ai = AIService(provider=AIProvider(chat_model=OPENAI_CHAT_MODEL, whisper_model=OPENAI_WHISPER_MODEL))
-
-    translated = await translate_segments(
-        segments=segments,
-        source_language=source_language,
-        target_language='Russian',
-        ai_service=ai,
-    )
-    translated = await constrain_translated_segments(
-        translated,
-        target_language='Russian',
-        ai_service=ai,
-    )
-    tts_items = await synthesize_segment_audios(ai, translated, target_language='Russian')
-    out = await compose_dubbed_video_from_segments(video, tts_items)
-
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    final = OUT_DIR / f'{video.stem}_ru_dub_manualroles.mp4'
-    out.replace(final)
-    print(final)
+    try:
+        translated = await translate_segments(
+            segments=segments,
+            source_language=source_language,
+            target_language='Russian',
+            ai_service=ai,
+        )
+        translated = await constrain_translated_segments(
+            translated,
+            target_language='Russian',
+            ai_service=ai,
+        )
+        tts_items = await synthesize_segment_audios(ai, translated, target_language='Russian')
+        out = await compose_dubbed_video_from_segments(video, tts_items)
+
+        OUT_DIR.mkdir(parents=True, exist_ok=True)
+        final = OUT_DIR / f'{video.stem}_ru_dub_manualroles.mp4'
+        out.replace(final)
+        print(final)
+    finally:
+        await ai.close()
 
 
 if __name__ == '__main__':
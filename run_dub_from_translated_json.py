@@ -111,19 +111,21 @@ async def main() -> None:
     ]
 
     ai = AIService(provider=AIProvider(chat_model=OPENAI_CHAT_MODEL, whisper_model=OPENAI_WHISPER_MODEL))
-
-    # Restored AUTO-FIT mode:
-    # - TTS duration fit
-    # - timing_rewrite when phrase does not fit in segment slot
-    tts_items = await synthesize_segment_audios(ai, segments, target_language='Russian')
-    report_path = await _write_quality_report(video, tts_items)
-    out = await compose_dubbed_video_from_segments(video, tts_items)
-
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    final = OUT_DIR / f'{video.stem}_ru_dub_customtranslate_AUTOFIT.mp4'
-    out.replace(final)
-    print(final)
-    print(report_path)
+    try:
+        # Restored AUTO-FIT mode:
+        # - TTS duration fit
+        # - timing_rewrite when phrase does not fit in segment slot
+        tts_items = await synthesize_segment_audios(ai, segments, target_language='Russian')
+        report_path = await _write_quality_report(video, tts_items)
+        out = await compose_dubbed_video_from_segments(video, tts_items)
+
+        OUT_DIR.mkdir(parents=True, exist_ok=True)
+        final = OUT_DIR / f'{video.stem}_ru_dub_customtranslate_AUTOFIT.mp4'
+        out.replace(final)
+        print(final)
+        print(report_path)
+    finally:
+        await ai.close()
 
 
 if __name__ == '__main__':
@@ -15,10 +15,13 @@ OUT_DIR = Path('/home/fanfan/projects/dubfilm/out')
 async def main() -> None:
     OUT_DIR.mkdir(parents=True, exist_ok=True)
     ai = AIService(provider=AIProvider(chat_model=OPENAI_CHAT_MODEL, whisper_model=OPENAI_WHISPER_MODEL))
-    out = await run_dub_pipeline(VIDEO, 'Russian', ai)
-    final = OUT_DIR / f'{VIDEO.stem}_ru_dub.mp4'
-    out.replace(final)
-    print(final)
+    try:
+        out = await run_dub_pipeline(VIDEO, 'Russian', ai)
+        final = OUT_DIR / f'{VIDEO.stem}_ru_dub.mp4'
+        out.replace(final)
+        print(final)
+    finally:
+        await ai.close()
 
 
 if __name__ == '__main__':
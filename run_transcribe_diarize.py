@@ -88,84 +88,87 @@ async def main() -> None:
     video = pick_latest_video()
 
     ai = AIService(provider=AIProvider(chat_model=OPENAI_CHAT_MODEL, whisper_model=OPENAI_WHISPER_MODEL))
-
-    audio_path = await extract_audio_from_video(video)
     try:
-        result = await ai.transcribe_audio(audio_path)
-    finally:
-        audio_path.unlink(missing_ok=True)
-
-    source_language = (result.get('language') or 'unknown')
-    raw_segments = result.get('segments') or []
-
-    base_segments: list[SubtitleSegment] = []
-    for s in raw_segments:
-        text = (s.get('text') or '').strip()
-        if not text:
-            continue
-        base_segments.append(
-            SubtitleSegment(
-                start=float(s.get('start') or 0.0),
-                end=float(s.get('end') or 0.0),
-                text=text,
-                speaker=s.get('speaker'),
-            )
-        )
-
-    # Lecture-safe segmentation: reduce over-splitting for one-speaker lectures.
-    base_segments = lecture_safe_merge_segments(base_segments)
-
-    # Draft RU translation per segment (1:1) to avoid cross-segment drift.
-    translated_texts: list[str] = []
-    for seg in base_segments:
+        audio_path = await extract_audio_from_video(video)
         try:
-            tr = await run_translation(
-                text=seg.text,
-                source_language=source_language,
-                target_language='Russian',
-                ai_service=ai,
+            result = await ai.transcribe_audio(audio_path)
+        finally:
+            audio_path.unlink(missing_ok=True)
+
+        source_language = (result.get('language') or 'unknown')
+        raw_segments = result.get('segments') or []
+
+        base_segments: list[SubtitleSegment] = []
+        for s in raw_segments:
+            text = (s.get('text') or '').strip()
+            if not text:
+                continue
+            base_segments.append(
+                SubtitleSegment(
+                    start=float(s.get('start') or 0.0),
+                    end=float(s.get('end') or 0.0),
+                    text=text,
+                    speaker=s.get('speaker'),
+                )
             )
-        except Exception:
-            tr = seg.text
-        translated_texts.append((tr or '').strip())
-
-    segments_payload = []
-    for idx, seg in enumerate(base_segments, start=1):
-        tr_text = translated_texts[idx - 1] if idx - 1 < len(translated_texts) else ''
-        cps, fit_status, risk_note = _fit_metrics(tr_text, seg.start, seg.end)
-        item = {
-            'id': idx,
-            'start': seg.start,
-            'end': seg.end,
-            'start_tc': _tc(seg.start),
-            'end_tc': _tc(seg.end),
-            'text': seg.text,
-            'translation_ru': tr_text,
-            'cps': round(cps, 2),
-            'fit_status': fit_status,
-            'risk_note': risk_note,
+
+        # Lecture-safe segmentation: reduce over-splitting for one-speaker lectures.
+        base_segments = lecture_safe_merge_segments(base_segments)
+
+        # Draft RU translation per segment (1:1) to avoid cross-segment drift.
+        translated_texts: list[str] = []
+        for seg in base_segments:
+            try:
+                tr = await run_translation(
+                    text=seg.text,
+                    source_language=source_language,
+                    target_language='Russian',
+                    ai_service=ai,
+                )
+            except Exception:
+                tr = seg.text
+            translated_texts.append((tr or '').strip())
+
+        segments_payload = []
+        for idx, seg in enumerate(base_segments, start=1):
+            tr_text = translated_texts[idx - 1] if idx - 1 < len(translated_texts) else ''
+            cps, fit_status, risk_note = _fit_metrics(tr_text, seg.start, seg.end)
+            item = {
+                'id': idx,
+                'start': seg.start,
+                'end': seg.end,
+                'start_tc': _tc(seg.start),
+                'end_tc': _tc(seg.end),
+                'text': seg.text,
+                'translation_ru': tr_text,
+                'cps': round(cps, 2),
+                'fit_status': fit_status,
+                'risk_note': risk_note,
+            }
+            if seg.speaker is not None:
+                item['speaker'] = seg.speaker
+            segments_payload.append(item)
+
+        payload = {
+            'video': str(video),
+            'language': source_language,
+            'segment_count': len(segments_payload),
+            'segments': segments_payload,
         }
-        if seg.speaker is not None:
-            item['speaker'] = seg.speaker
-        segments_payload.append(item)
-
-    payload = {
-        'video': str(video),
-        'language': source_language,
-        'segment_count': len(segments_payload),
-        'segments': segments_payload,
-    }
-
-    # Main output for edit -> render flow
-    translated_json_path = OUT_DIR / 'lecture_segments_translated.json'
-    translated_json_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-
-    # Also keep per-video snapshot
-    snapshot_path = OUT_DIR / f'{video.stem}_segments_translated_draft.json'
-    snapshot_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
-
-    print(translated_json_path)
-    print(snapshot_path)
+
+        # Main output for edit -> render flow
+        payload_text = json.dumps(payload, ensure_ascii=False, indent=2)
+        translated_json_path = OUT_DIR / 'lecture_segments_translated.json'
+        translated_json_path.write_text(payload_text, encoding='utf-8')
+
+        # Also keep per-video snapshot
+        snapshot_path = OUT_DIR / f'{video.stem}_segments_translated_draft.json'
+        snapshot_path.write_text(payload_text, encoding='utf-8')
+
+        print(translated_json_path)
+        print(snapshot_path)
+    finally:
+        await ai.close()
 
 
 if __name__ == '__main__':
@@ -8,6 +8,7 @@ from aiogram import Bot
 from aiogram.types import Message
 
 from config import TEMP_DIR
+from services.concurrency import SUBPROCESS_SEMAPHORE
 from services.video_duration import validate_media_duration  # <-- ВАЖНО
 
 logger = logging.getLogger(__name__)
@@ -44,29 +45,48 @@ async def _download_file(bot: Bot, file_id: str, destination: Path) -> Path:
     return destination
 
 
-async def convert_to_wav(source_path: Path) -> Path:
-    target_path = source_path.with_name(f"{source_path.stem}_conv.wav")
+async def convert_to_wav(source_path: Path, target_path: Optional[Path] = None) -> Path:
+    if target_path is None:
+        target_path = source_path.with_name(f"{source_path.stem}_conv.wav")
+
+    async with SUBPROCESS_SEMAPHORE:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-y",
+            "-i", str(source_path),
+            "-vn",
+            "-acodec", "pcm_s16le",
+            "-ar", "16000",
+            "-ac", "1",
+            str(target_path),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            target_path.unlink(missing_ok=True)
+            raise
 
-    process = await asyncio.create_subprocess_exec(
-        "ffmpeg",
-        "-y",
-        "-i", str(source_path),
-        "-vn",
-        "-acodec", "pcm_s16le",
-        "-ar", "16000",
-        "-ac", "1",
-        str(target_path),
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-
-    stdout, stderr = await process.communicate()
     if process.returncode != 0:
         raise RuntimeError(stderr.decode() or stdout.decode())
 
     return target_path
 
 
+async def _discard_conversion(task: asyncio.Task[Path]) -> None:
+    task.cancel()
+    try:
+        wav_path = await task
+    except (asyncio.CancelledError, Exception):
+        return
+    # Conversion finished before it could be cancelled.
+    wav_path.unlink(missing_ok=True)
+
+
 async def prepare_audio_file(bot: Bot, media: Message) -> Path:
     file_id, suffix, file_size = _extract_file_data(media)
 
@@ -84,16 +104,24 @@ async def prepare_audio_file(bot: Bot, media: Message) -> Path:
         raise ValueError("File exceeds maximum allowed size")
 
     # скачиваем
-    raw_path = TEMP_DIR / f"{uuid4()}{suffix}"
+    uid = uuid4()
+    raw_path = TEMP_DIR / f"{uid}{suffix}"
+    wav_target = TEMP_DIR / f"{uid}_conv.wav"
     downloaded_path = await _download_file(bot, file_id, raw_path)
 
     try:
+        # конвертация идёт параллельно с проверкой длительности
+        convert_task = asyncio.create_task(convert_to_wav(downloaded_path, wav_target))
+
         # проверяем длительность и АУДИО, и ВИДЕО
         if is_audio_media or is_video_media:
-            await validate_media_duration(downloaded_path)
+            try:
+                await validate_media_duration(downloaded_path)
+            except BaseException:
+                await _discard_conversion(convert_task)
+                raise
 
-        # конвертация
-        wav_path = await convert_to_wav(downloaded_path)
+        wav_path = await convert_task
 
         # проверяем размер WAV перед отправкой в Whisper
         if wav_path.stat().st_size > MAX_WHISPER_SIZE_BYTES:
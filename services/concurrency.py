@@ -0,0 +1,14 @@
+import asyncio
+
+from config import LLM_CONCURRENCY, MAX_CONCURRENT_DOWNLOADS, MAX_CONCURRENT_JOBS
+
+# Shared cap on heavy external processes (ffmpeg, yt-dlp, ffsubsync) across all handlers,
+# so a burst of users queues up instead of spawning unbounded encoders.
+SUBPROCESS_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+
+# yt-dlp downloads get their own cap: they wait on the network, not the CPU, and must not
+# block ffmpeg jobs while a slow site trickles data.
+DOWNLOAD_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+
+# Cap on in-flight LLM translation requests, shared by all subtitle/dub jobs.
+LLM_SEMAPHORE = asyncio.Semaphore(LLM_CONCURRENCY)
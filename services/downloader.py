@@ -1,12 +1,13 @@
 import asyncio
-import json
 import logging
+import re
 from pathlib import Path
 from urllib.parse import urlparse
 from uuid import uuid4
 
 from config import TEMP_DIR
 from services.audio import convert_to_wav
+from services.concurrency import DOWNLOAD_SEMAPHORE
 
 logger = logging.getLogger(__name__)
 
@@ -19,48 +20,34 @@ SUPPORTED_DOMAINS = (
     "fb.watch",
 )
 
+# Хост должен совпадать с доменом или быть его поддоменом (evil-youtube.com.attacker.io не проходит)
+_SUPPORTED_HOST_RE = re.compile(
+    r"(?:^|\.)(?:" + "|".join(re.escape(domain) for domain in SUPPORTED_DOMAINS) + r")\Z",
+    re.IGNORECASE,
+)
+
 DOWNLOAD_TIMEOUT = 120
 MAX_DURATION_SEC = 300  # 5 минут
 
 
 def is_supported_media_url(url: str) -> bool:
-    parsed = urlparse(url)
-    hostname = (parsed.hostname or "").lower()
-    return any(domain in hostname for domain in SUPPORTED_DOMAINS)
-
-
-async def _run_subprocess(*cmd: str, timeout: float | None = None) -> tuple[str, str, int]:
-    process = await asyncio.create_subprocess_exec(
-        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
-    try:
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-    except asyncio.TimeoutError:
-        process.kill()
-        stdout, stderr = await process.communicate()
-        raise TimeoutError(f"{cmd[0]} timed out after {timeout} seconds")
-
-    return stdout.decode(), stderr.decode(), process.returncode
+    return bool(_SUPPORTED_HOST_RE.search(urlparse(url).hostname or ""))
 
 
-# 🔥 NEW: проверка длительности до скачивания
-async def _get_duration_from_url(url: str) -> float:
-    stdout, stderr, returncode = await _run_subprocess(
-        "yt-dlp",
-        "--dump-json",
-        url,
-        timeout=20,
-    )
-
-    if returncode != 0:
-        raise RuntimeError(stderr or stdout)
+async def _run_subprocess(*cmd: str, timeout: float | None = None) -> tuple[bytes, bytes, int]:
+    async with DOWNLOAD_SEMAPHORE:
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            stdout, stderr = await process.communicate()
+            raise TimeoutError(f"{cmd[0]} timed out after {timeout} seconds")
 
-    try:
-        info = json.loads(stdout)
-        duration = float(info.get("duration") or 0)
-        return duration
-    except Exception:
-        raise RuntimeError("Unable to read duration from yt-dlp")
+    # Raw bytes: yt-dlp stderr can be large and is only needed on failure.
+    return stdout, stderr, process.returncode
 
 
 async def _download_media(url: str) -> Path:
@@ -68,10 +55,15 @@ async def _download_media(url: str) -> Path:
     download_dir.mkdir(parents=True, exist_ok=True)
     output_template = download_dir / "%(title)s.%(ext)s"
 
+    # Один запуск yt-dlp: фильтр длительности + путь итогового файла в stdout
     stdout, stderr, returncode = await _run_subprocess(
         "yt-dlp",
         "-f",
         "bv*+ba/b",
+        "--match-filter",
+        f"duration <=? {MAX_DURATION_SEC}",
+        "--print",
+        "after_move:filepath",
         "-o",
         str(output_template),
         url,
@@ -79,23 +71,18 @@ async def _download_media(url: str) -> Path:
     )
 
     if returncode != 0:
-        raise RuntimeError(stderr or stdout)
+        raise RuntimeError((stderr or stdout).decode(errors="replace"))
 
-    files = sorted(download_dir.glob("*"))
-    if not files:
-        raise FileNotFoundError("yt-dlp produced no files")
+    lines = stdout.decode(errors="replace").strip().splitlines()
+    if not lines:
+        # --match-filter skips rejected videos without an error, so nothing is printed.
+        raise ValueError("Video too long")
 
-    return max(files, key=lambda p: p.stat().st_size)
+    return Path(lines[-1])
 
 
 async def download_audio_from_url(url: str) -> Path:
-    # 🔥 1. Проверяем длительность ДО скачивания
-    duration = await _get_duration_from_url(url)
-
-    if duration > MAX_DURATION_SEC:
-        raise ValueError("Video too long")
-
-    # 🔥 2. Скачиваем, если видео прошло проверку
+    # Длительность проверяется yt-dlp до скачивания (--match-filter)
     media_path = await _download_media(url)
 
     try:
@@ -12,6 +12,7 @@ from config import (
     DUB_TTS_MAX_SPEED,
     DUB_TARGET_CHARS_PER_SEC,
     DUB_MIN_SEGMENT_DURATION,
+    FFMPEG_THREADS,
     DUB_MULTI_VOICE,
     DUB_MULTI_VOICE_LIST,
     DUB_MULTI_VOICE_MAP,
@@ -609,6 +610,10 @@ async def compose_dubbed_video_from_segments(
         "copy",
         "-c:a",
         "aac",
+        "-threads",
+        str(FFMPEG_THREADS),
+        "-filter_complex_threads",
+        str(FFMPEG_THREADS),
         str(output_path),
     ]
 
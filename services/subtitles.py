@@ -1,13 +1,24 @@
 import asyncio
 import logging
+import os
+import random
 import re
+import wave
+from collections import deque
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Awaitable, Callable, TypeVar
 from uuid import uuid4
 
+import aiohttp
+
 from ai.service import AIService
 from config import (
     TEMP_DIR,
+    FFMPEG_HW_ENCODER,
+    FFMPEG_PRESET,
+    FFMPEG_THREADS,
     FFSUBSYNC_VAD,
     FFSUBSYNC_MAX_OFFSET_SECONDS,
     FFSUBSYNC_USE_GSS,
@@ -17,15 +28,26 @@ from config import (
     GLOSSARY_PATH,
     GLOSSARY_SKIP_QURAN_AYAHS,
     ISLAMIC_TRANSLATION_MODE,
+    OPENAI_CHAT_MODEL,
+    SUBTITLE_URL_MAX_DURATION_SEC,
+    SUBTITLE_URL_MAX_FILESIZE_MB,
+    SUBTITLE_URL_DOWNLOAD_TIMEOUT,
+    TRANSCRIBE_CHUNK_SECONDS,
+    TRANSCRIBE_CHUNK_CONCURRENCY,
+    TRANSLATE_BATCH_SIZE,
 )
+from services.concurrency import DOWNLOAD_SEMAPHORE, LLM_SEMAPHORE, SUBPROCESS_SEMAPHORE
 from services.downloader import is_supported_media_url
-from services.video_duration import validate_video_duration
+from services.translation_cache import get_cached_translations, store_translations
+from services.video_duration import probe_media, validate_video_duration
 import json
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
-@dataclass
+@dataclass(slots=True)
 class SubtitleSegment:
     start: float
     end: float
@@ -35,8 +57,27 @@ class SubtitleSegment:
 
 _MEANINGFUL_TEXT_RE = re.compile(r"[A-Za-zА-Яа-я0-9]")
 _ARABIC_RE = re.compile(r"[\u0600-\u06FF]")
+_TRANSLATION_RE = re.compile(r"\[(\d+)\]\s*(.*?)(?=(?:\n\[\d+\]\s)|\Z)", re.DOTALL)
+_SILENCE_END_RE = re.compile(r"silence_end:\s*([0-9]+(?:\.[0-9]+)?)")
+_FFSUBSYNC_OFFSET_RE = re.compile(r"offset seconds:\s*([-+]?\d+(?:\.\d+)?)")
+_BRACKET_TRANS = str.maketrans("[]", "()")
+
+# Один слой ретраев на каждый тип ошибки. OpenAI-вызовы уже повторяет сам SDK (429, 5xx,
+# обрывы — max_retries=2), а Whisper ещё и свой цикл на таймауты соединения; здесь повторяем
+# только то, что ниже никто не повторяет: сетевые ошибки AssemblyAI (aiohttp) и
+# неразобранный ответ модели при переводе.
+_TRANSCRIBE_RETRY_ERRORS: tuple[type[BaseException], ...] = (aiohttp.ClientError,)
+_AI_RETRY_ATTEMPTS = 3
+# Увеличить при изменении системного промпта перевода в ai/provider.py — сбрасывает кэш переводов.
+_TRANSLATION_CACHE_VERSION = 1
+_AI_RETRY_BASE_DELAY = 1.0
+
+
+class _EmptyTranslationError(RuntimeError):
+    pass
 
 
+@lru_cache(maxsize=1)
 def _load_glossary_map() -> tuple[dict[str, dict], dict[str, str]]:
     if not GLOSSARY_ENABLED:
         return {}, {}
@@ -57,18 +98,28 @@ def _load_glossary_map() -> tuple[dict[str, dict], dict[str, str]]:
         return {}, {}
 
 
-def _apply_glossary_to_text(text: str, glossary_by_term: dict[str, dict], glossary_by_term_lc: dict[str, str]) -> str:
-    out = text
+@lru_cache(maxsize=1)
+def _load_glossary_rules() -> tuple[tuple[re.Pattern[str], str], ...]:
+    """Compile glossary replacements once instead of per term, per segment."""
+    glossary_by_term, _ = _load_glossary_map()
+    rules: list[tuple[re.Pattern[str], str]] = []
     for term, entry in glossary_by_term.items():
         preferred = (entry.get("preferred") or "").strip()
         if not preferred:
             continue
         # Replace case-insensitively with word boundaries.
-        out = re.sub(rf"\b{re.escape(term)}\b", preferred, out, flags=re.IGNORECASE)
+        rules.append((re.compile(rf"\b{re.escape(term)}\b", re.IGNORECASE), preferred))
         for bad in entry.get("forbidden", []) or []:
             bad_s = (bad or "").strip()
             if bad_s:
-                out = re.sub(rf"\b{re.escape(bad_s)}\b", preferred, out, flags=re.IGNORECASE)
+                rules.append((re.compile(rf"\b{re.escape(bad_s)}\b", re.IGNORECASE), preferred))
+    return tuple(rules)
+
+
+def _apply_glossary_to_text(text: str, glossary_rules: tuple[tuple[re.Pattern[str], str], ...]) -> str:
+    out = text
+    for pattern, preferred in glossary_rules:
+        out = pattern.sub(preferred, out)
     return out
 
 
@@ -84,18 +135,49 @@ def _is_likely_quran_ayah(segment_text: str) -> bool:
     return any(h in t for h in hints)
 
 
-async def _run_subprocess(*cmd: str, timeout: float | None = None) -> tuple[str, str, int]:
+async def _retry(
+    coro_fn: Callable[[], Awaitable[T]],
+    *,
+    what: str,
+    retry_on: tuple[type[BaseException], ...],
+    attempts: int = _AI_RETRY_ATTEMPTS,
+) -> T:
+    """Повторяет вызов при временных ошибках: экспоненциальная пауза с full jitter."""
+    for attempt in range(attempts - 1):
+        try:
+            return await coro_fn()
+        except retry_on as exc:
+            delay = random.uniform(0, _AI_RETRY_BASE_DELAY * 2**attempt)
+            logger.warning(
+                "%s failed (attempt %d/%d): %s; retrying in %.1fs",
+                what,
+                attempt + 1,
+                attempts,
+                exc,
+                delay,
+            )
+            await asyncio.sleep(delay)
+    return await coro_fn()
+
+
+async def _run_subprocess(
+    *cmd: str,
+    timeout: float | None = None,
+    pass_fds: tuple[int, ...] = (),
+    semaphore: asyncio.Semaphore = SUBPROCESS_SEMAPHORE,
+) -> tuple[str, str, int]:
     logger.debug("Running subprocess: %s", " ".join(cmd))
-    process = await asyncio.create_subprocess_exec(
-        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
-    try:
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-    except asyncio.TimeoutError:
-        logger.error("Command %s timed out after %.0f seconds", cmd[0], timeout or 0)
-        process.kill()
-        stdout, stderr = await process.communicate()
-        raise TimeoutError(f"{cmd[0]} timed out after {timeout} seconds")
+    async with semaphore:
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, pass_fds=pass_fds
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error("Command %s timed out after %.0f seconds", cmd[0], timeout or 0)
+            process.kill()
+            stdout, stderr = await process.communicate()
+            raise TimeoutError(f"{cmd[0]} timed out after {timeout} seconds")
 
     return stdout.decode(), stderr.decode(), process.returncode
 
@@ -104,23 +186,24 @@ async def extract_audio_from_video(video_path: Path) -> Path:
     audio_path = TEMP_DIR / f"{video_path.stem}_audio_{uuid4().hex}.wav"
     logger.info("Extracting audio from %s to %s", video_path, audio_path)
 
-    process = await asyncio.create_subprocess_exec(
-        "ffmpeg",
-        "-y",
-        "-i",
-        str(video_path),
-        "-vn",
-        "-acodec",
-        "pcm_s16le",
-        "-ar",
-        "16000",
-        "-ac",
-        "1",
-        str(audio_path),
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    stdout, stderr = await process.communicate()
+    async with SUBPROCESS_SEMAPHORE:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-y",
+            "-i",
+            str(video_path),
+            "-vn",
+            "-acodec",
+            "pcm_s16le",
+            "-ar",
+            "16000",
+            "-ac",
+            "1",
+            str(audio_path),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
     if process.returncode != 0:
         error_output = stderr.decode() or stdout.decode()
         logger.error("ffmpeg failed to extract audio from %s: %s", video_path, error_output)
@@ -129,26 +212,124 @@ async def extract_audio_from_video(video_path: Path) -> Path:
     return audio_path
 
 
+def _wav_duration(path: Path) -> float:
+    with wave.open(str(path), "rb") as wav_file:
+        return wav_file.getnframes() / float(wav_file.getframerate())
+
+
+# Хвост короче этого приклеиваем к предыдущему чанку: Whisper отвечает 400 на аудио < 0.1 c,
+# а секунда без контекста всё равно распознаётся плохо.
+_MIN_TRAILING_CHUNK_SECONDS = 1.0
+
+
+def _merge_trailing_wav(previous: Path, trailing: Path) -> None:
+    with wave.open(str(trailing), "rb") as tail_file:
+        tail_frames = tail_file.readframes(tail_file.getnframes())
+    with wave.open(str(previous), "rb") as prev_file:
+        params = prev_file.getparams()
+        frames = prev_file.readframes(prev_file.getnframes())
+    with wave.open(str(previous), "wb") as out_file:
+        out_file.setparams(params)
+        out_file.writeframes(frames + tail_frames)
+    trailing.unlink(missing_ok=True)
+
+
+async def _transcribe_in_chunks(audio_path: Path, ai_service: AIService, chunk_seconds: float) -> dict:
+    """Split WAV with ffmpeg's segment muxer (stream copy) and transcribe chunks concurrently.
+    Segment timestamps are shifted by the real duration of preceding chunks.
+    """
+    chunk_dir = TEMP_DIR / f"chunks_{uuid4().hex}"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        stdout, stderr, returncode = await _run_subprocess(
+            "ffmpeg",
+            "-y",
+            "-i",
+            str(audio_path),
+            "-f",
+            "segment",
+            "-segment_time",
+            str(chunk_seconds),
+            "-c",
+            "copy",
+            str(chunk_dir / "chunk_%03d.wav"),
+        )
+        if returncode != 0:
+            raise RuntimeError(stderr or stdout)
+
+        chunks = sorted(chunk_dir.glob("chunk_*.wav"))
+        if len(chunks) > 1 and _wav_duration(chunks[-1]) < _MIN_TRAILING_CHUNK_SECONDS:
+            _merge_trailing_wav(chunks[-2], chunks[-1])
+            chunks.pop()
+        if len(chunks) <= 1:
+            return await _retry(
+                lambda: ai_service.transcribe_audio(audio_path),
+                what="Transcription",
+                retry_on=_TRANSCRIBE_RETRY_ERRORS,
+            )
+
+        semaphore = asyncio.Semaphore(TRANSCRIBE_CHUNK_CONCURRENCY)
+
+        async def _transcribe_chunk(chunk_path: Path) -> dict:
+            async with semaphore:
+                return await _retry(
+                    lambda: ai_service.transcribe_audio(chunk_path),
+                    what=f"Transcription of {chunk_path.name}",
+                    retry_on=_TRANSCRIBE_RETRY_ERRORS,
+                )
+
+        logger.info("Transcribing %d chunks of %.0fs concurrently", len(chunks), chunk_seconds)
+        results = await asyncio.gather(*(_transcribe_chunk(chunk) for chunk in chunks))
+
+        language = "unknown"
+        texts: list[str] = []
+        segments: list[dict] = []
+        offset = 0.0
+        for chunk_path, chunk_result in zip(chunks, results):
+            if language == "unknown":
+                language = chunk_result.get("language") or "unknown"
+            chunk_text = (chunk_result.get("text") or "").strip()
+            if chunk_text:
+                texts.append(chunk_text)
+            for seg in chunk_result.get("segments", []) or []:
+                shifted = dict(seg)
+                shifted["start"] = float(seg.get("start", 0.0)) + offset
+                shifted["end"] = float(seg.get("end", seg.get("start", 0.0))) + offset
+                segments.append(shifted)
+            offset += _wav_duration(chunk_path)
+
+        return {"text": " ".join(texts), "language": language, "segments": segments}
+    finally:
+        for chunk_path in chunk_dir.glob("*"):
+            chunk_path.unlink(missing_ok=True)
+        try:
+            chunk_dir.rmdir()
+        except OSError:
+            logger.debug("Chunk directory %s not removed", chunk_dir)
+
+
 async def transcribe_segments(audio_path: Path, ai_service: AIService) -> tuple[list[SubtitleSegment], str]:
     logger.info("Transcribing audio for subtitles: %s", audio_path)
-    result = await ai_service.transcribe_audio(audio_path)
+    if TRANSCRIBE_CHUNK_SECONDS > 0:
+        result = await _transcribe_in_chunks(audio_path, ai_service, TRANSCRIBE_CHUNK_SECONDS)
+    else:
+        result = await _retry(
+            lambda: ai_service.transcribe_audio(audio_path),
+            what="Transcription",
+            retry_on=_TRANSCRIBE_RETRY_ERRORS,
+        )
     language = result.get("language", "unknown")
 
     segments: list[SubtitleSegment] = []
     for seg in result.get("segments", []) or []:
         try:
+            text = (seg.get("text") or "").strip()
+            if not text:
+                continue
             start = float(seg.get("start", 0.0))
-            end = float(seg.get("end", start))
-            text = seg.get("text", "").strip()
-            if text:
-                segments.append(
-                    SubtitleSegment(
-                        start=start,
-                        end=end,
-                        text=text,
-                        speaker=(seg.get("speaker") if isinstance(seg, dict) else None),
-                    )
-                )
+            segments.append(
+                SubtitleSegment(start=start, end=float(seg.get("end", start)), text=text, speaker=seg.get("speaker"))
+            )
         except Exception:
             logger.exception("Failed to parse segment %s", seg)
 
@@ -248,7 +429,7 @@ async def detect_first_speech_start(
 
     output = (stderr or "") + "\n" + (stdout or "")
     # We care about initial silence_end if present.
-    m = re.search(r"silence_end:\s*([0-9]+(?:\.[0-9]+)?)", output)
+    m = _SILENCE_END_RE.search(output)
     if m:
         try:
             return max(0.0, float(m.group(1)))
@@ -260,23 +441,8 @@ async def detect_first_speech_start(
 
 
 async def get_audio_start_offset(video_path: Path) -> float:
-    stdout, stderr, returncode = await _run_subprocess(
-        "ffprobe",
-        "-v",
-        "error",
-        "-select_streams",
-        "a:0",
-        "-show_entries",
-        "stream=start_time",
-        "-of",
-        "default=nw=1:nk=1",
-        str(video_path),
-    )
-
-    if returncode != 0:
-        raise RuntimeError(stderr or stdout)
-
-    raw_value = stdout.strip()
+    # start_time аудиодорожки приходит из общего ffprobe-кэша (см. probe_media).
+    raw_value = (await probe_media(video_path)).get("audio_start_time") or ""
     if not raw_value:
         return 0.0
 
@@ -307,8 +473,8 @@ async def translate_segments(
 
 
 def _format_timestamp(seconds: float) -> str:
-    milliseconds = int(round(seconds * 1000))
-    hours, remainder = divmod(milliseconds, 3_600_000)
+    # Timestamps are never negative here, so +0.5 truncation rounds to the nearest ms.
+    hours, remainder = divmod(int(seconds * 1000 + 0.5), 3_600_000)
     minutes, remainder = divmod(remainder, 60_000)
     secs, millis = divmod(remainder, 1000)
     return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
@@ -398,17 +564,16 @@ def _split_segment_to_fit(segment: SubtitleSegment, max_chars_per_line: int = 24
 
 def build_srt_content(segments: list[SubtitleSegment]) -> str:
     logger.info("Building SRT content for %d segments", len(segments))
-    fitted_segments: list[SubtitleSegment] = []
-    for segment in segments:
-        fitted_segments.extend(_split_segment_to_fit(segment))
-
-    lines: list[str] = []
-    for idx, segment in enumerate(fitted_segments, start=1):
-        start_ts = _format_timestamp(segment.start)
-        end_ts = _format_timestamp(segment.end if segment.end > segment.start else segment.start + 1.2)
-        wrapped_text = _wrap_subtitle_text(segment.text)
-        lines.extend([str(idx), f"{start_ts} --> {end_ts}", wrapped_text, ""])
-    return "\n".join(lines).strip() + "\n"
+    fitted_segments = [chunk for segment in segments for chunk in _split_segment_to_fit(segment)]
+
+    blocks = (
+        f"{idx}\n"
+        f"{_format_timestamp(segment.start)} --> "
+        f"{_format_timestamp(segment.end if segment.end > segment.start else segment.start + 1.2)}\n"
+        f"{_wrap_subtitle_text(segment.text)}\n"
+        for idx, segment in enumerate(fitted_segments, start=1)
+    )
+    return "\n".join(blocks).strip() + "\n"
 
 
 async def batch_translate_segments(
@@ -423,9 +588,10 @@ async def batch_translate_segments(
     if len(segments) > 200:
         raise RuntimeError("Too many subtitle segments for batch translation")
 
-    glossary_by_term, glossary_by_term_lc = _load_glossary_map()
+    glossary_by_term, _ = _load_glossary_map()
+    glossary_rules = _load_glossary_rules()
 
-    numbered_texts: list[str] = []
+    source_texts: dict[int, str] = {}
     skip_translate_idx: set[int] = set()
     for idx, segment in enumerate(segments, start=1):
         segment_text = (segment.text or "").strip()
@@ -435,16 +601,7 @@ async def batch_translate_segments(
             skip_translate_idx.add(idx)
 
         # ✅ защита от квадратных скобок
-        segment_text = segment_text.replace("[", "(").replace("]", ")")
-        numbered_texts.append(f"[{idx}] {segment_text}")
-
-    skip_line = ""
-    if skip_translate_idx:
-        skip_line = (
-            "Строки с номерами "
-            + ", ".join(str(i) for i in sorted(skip_translate_idx))
-            + " НЕ переводи, верни их как есть (оригинал).\n"
-        )
+        source_texts[idx] = segment_text.translate(_BRACKET_TRANS)
 
     glossary_line = ""
     if glossary_by_term:
@@ -465,46 +622,144 @@ async def batch_translate_segments(
             "Не используй сленг и иронию в религиозном контексте.\n"
         )
 
-    prompt = (
+    static_prefix = (
         islamic_rules
-        + f"Переведи каждый пункт списка с {source_language} на {target_language}.\n"
+        + "Переведи каждый пункт списка ниже на указанный язык.\n"
         "Сохрани нумерацию и порядок.\n"
         "Не добавляй комментариев.\n"
         "Не объединяй строки.\n"
-        + skip_line
         + glossary_line
         + "Формат ответа строго:\n\n"
         "[1] перевод\n"
         "[2] перевод\n"
         "[3] перевод\n\n"
-        f"{chr(10).join(numbered_texts)}"
     )
 
-    try:
-        translated_response = await ai_service.translate_text(
-            text=prompt,
-            source_language="auto",   # ✅ ВАЖНО
-            target_language=target_language,
-        )
-    except Exception:
-        logger.exception(
-            "Failed to translate subtitle batch from %s to %s",
-            source_language,
-            target_language,
+    # Правила промпта и модель входят в ключ кэша: смена режима, глоссария или модели
+    # не отдаёт старые переводы.
+    cache_variant = f"v{_TRANSLATION_CACHE_VERSION}\x00{OPENAI_CHAT_MODEL}\x00{static_prefix}"
+    cached = await get_cached_translations(
+        [text for idx, text in source_texts.items() if idx not in skip_translate_idx],
+        source_language,
+        target_language,
+        cache_variant,
+    )
+    translations: dict[int, str] = {
+        idx: cached[text]
+        for idx, text in source_texts.items()
+        if idx not in skip_translate_idx and text in cached
+    }
+    # В LLM уходят только промахи кэша; аяты остаются в списке как контекст.
+    pending = [(idx, text) for idx, text in source_texts.items() if idx not in translations]
+
+    async def _translate_chunk(chunk: list[tuple[int, str]]) -> tuple[dict[int, str], bool]:
+        """Returns (translations by global index, whether they may be cached)."""
+        # Внутри чанка строки нумеруются заново с [1] — как в образце формата ответа;
+        # ответ проверяется по этим номерам и переводится обратно в глобальные индексы.
+        chunk_indices = [idx for idx, _ in chunk]
+        local_skip = [n for n, idx in enumerate(chunk_indices, start=1) if idx in skip_translate_idx]
+        if len(local_skip) == len(chunk):
+            return {}, False
+        expected = set(range(1, len(chunk) + 1)) - set(local_skip)
+        attempts_made = 0
+
+        skip_line = ""
+        if local_skip:
+            skip_line = (
+                "Строки с номерами "
+                + ", ".join(str(n) for n in local_skip)
+                + " НЕ переводи, верни их как есть (оригинал).\n"
+            )
+
+        # Сначала неизменная часть (правила, глоссарий, формат) — она одинакова для всех
+        # чанков и запросов и попадает в prompt cache; языки, skip-строки и тексты в конце.
+        prompt = (
+            static_prefix
+            + f"Язык: с {source_language} на {target_language}.\n"
+            + skip_line
+            + "\n"
+            + "\n".join(f"[{n}] {text}" for n, (_, text) in enumerate(chunk, start=1))
         )
-        raise
-
-    translations: dict[int, str] = {}
-    for match in re.finditer(
-        r"\[(\d+)\]\s*(.*?)(?=(?:\n\[\d+\]\s)|\Z)",
-        translated_response.strip(),
-        flags=re.DOTALL,
-    ):
-        index = int(match.group(1))
-        text = match.group(2).strip()
-        translations[index] = text
-
-    if not translations:
+
+        async def _attempt() -> tuple[dict[int, str], bool]:
+            nonlocal attempts_made
+            attempts_made += 1
+            # Семафор держим только на время запроса, не во время паузы между попытками.
+            async with LLM_SEMAPHORE:
+                translated_response = await ai_service.translate_text(
+                    text=prompt,
+                    source_language="auto",   # ✅ ВАЖНО
+                    target_language=target_language,
+                )
+            local_translations = {
+                int(match.group(1)): match.group(2).strip()
+                for match in _TRANSLATION_RE.finditer(translated_response.strip())
+            }
+            missing = expected - local_translations.keys()
+            if not missing:
+                return {chunk_indices[n - 1]: local_translations[n] for n in expected}, True
+            if attempts_made < _AI_RETRY_ATTEMPTS:
+                # Потерянные или перенумерованные строки — повторяем запрос, а не
+                # раскладываем переводы по чужим сегментам.
+                raise _EmptyTranslationError(
+                    f"Batch translation is missing {len(missing)} of {len(expected)} lines"
+                )
+            # Последняя попытка: берём что есть, для пропущенных строк остаётся оригинал
+            # (как раньше). Такой ответ ненадёжен, поэтому в кэш он не попадает.
+            logger.warning(
+                "Subtitle batch [%s..%s]: %d of %d lines missing after %d attempts; keeping source text",
+                chunk_indices[0],
+                chunk_indices[-1],
+                len(missing),
+                len(expected),
+                attempts_made,
+            )
+            return {
+                chunk_indices[n - 1]: local_translations[n]
+                for n in expected
+                if n in local_translations
+            }, False
+
+        try:
+            return await _retry(
+                _attempt,
+                what=f"Subtitle batch [{chunk_indices[0]}..{chunk_indices[-1]}] translation",
+                retry_on=(_EmptyTranslationError,),
+            )
+        except Exception:
+            logger.exception(
+                "Failed to translate subtitle batch [%s..%s] from %s to %s",
+                chunk_indices[0],
+                chunk_indices[-1],
+                source_language,
+                target_language,
+            )
+            raise
+
+    # return_exceptions: упавший чанк не выбрасывает уже оплаченные переводы соседних —
+    # они сохраняются в кэш до того, как ошибка уйдёт наверх.
+    chunk_results = await asyncio.gather(
+        *(
+            _translate_chunk(pending[start:start + TRANSLATE_BATCH_SIZE])
+            for start in range(0, len(pending), TRANSLATE_BATCH_SIZE)
+        ),
+        return_exceptions=True,
+    )
+    fresh: dict[str, str] = {}
+    first_error: BaseException | None = None
+    for chunk_result in chunk_results:
+        if isinstance(chunk_result, BaseException):
+            first_error = first_error or chunk_result
+            continue
+        chunk_translations, cacheable = chunk_result
+        translations.update(chunk_translations)
+        if cacheable:
+            fresh.update((source_texts[idx], text) for idx, text in chunk_translations.items())
+    await store_translations(fresh, source_language, target_language, cache_variant)
+    if first_error is not None:
+        raise first_error
+
+    if not translations and len(skip_translate_idx) < len(segments):
         raise RuntimeError("Batch translation returned empty result")
 
     translated_segments: list[SubtitleSegment] = []
@@ -514,8 +769,8 @@ async def batch_translate_segments(
         else:
             translated_text = translations.get(idx, segment.text)
 
-        if glossary_by_term:
-            translated_text = _apply_glossary_to_text(translated_text, glossary_by_term, glossary_by_term_lc)
+        if glossary_rules:
+            translated_text = _apply_glossary_to_text(translated_text, glossary_rules)
 
         translated_segments.append(
             SubtitleSegment(
@@ -529,20 +784,12 @@ async def batch_translate_segments(
     return translated_segments
 
 async def get_video_resolution(video_path: Path) -> tuple[int, int]:
-    stdout, stderr, returncode = await _run_subprocess(
-        "ffprobe",
-        "-v", "error",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=p=0",
-        str(video_path),
-    )
-
-    if returncode != 0:
-        raise RuntimeError(stderr or stdout)
-
-    width, height = map(int, stdout.strip().split(","))
-    return width, height
+    # Размеры берутся из того же ffprobe, что проверял длительность при загрузке,
+    # поэтому перед прожигом отдельный процесс обычно не запускается.
+    probe = await probe_media(video_path)
+    if "width" not in probe or "height" not in probe:
+        raise RuntimeError("Unable to determine video resolution")
+    return probe["width"], probe["height"]
 
 
 
@@ -581,7 +828,7 @@ async def sync_srt_with_ffsubsync(video_path: Path, srt_content: str) -> str:
             return srt_content
 
         # Guardrail: reject suspiciously large offsets that usually indicate bad alignment match.
-        offset_match = re.search(r"offset seconds:\s*([-+]?\d+(?:\.\d+)?)", stderr or "")
+        offset_match = _FFSUBSYNC_OFFSET_RE.search(stderr or "")
         if offset_match:
             offset_value = abs(float(offset_match.group(1)))
             if offset_value > FFSUBSYNC_MAX_ACCEPTED_OFFSET_SECONDS:
@@ -604,15 +851,73 @@ async def sync_srt_with_ffsubsync(video_path: Path, srt_content: str) -> str:
         out_srt.unlink(missing_ok=True)
 
 
-async def burn_subtitles(video_path: Path, srt_content: str) -> Path:
-    subtitles_path = TEMP_DIR / f"subs_{uuid4().hex}.srt"
-    output_path = TEMP_DIR / f"out_{uuid4().hex}.mp4"
+_HW_ENCODER_ARGS: dict[str, tuple[str, ...]] = {
+    "h264_nvenc": ("-c:v", "h264_nvenc", "-preset", "p4", "-rc", "vbr", "-cq", "23", "-pix_fmt", "yuv420p"),
+    "h264_qsv": ("-c:v", "h264_qsv", "-preset", "faster", "-global_quality", "25", "-pix_fmt", "nv12"),
+}
+_hw_encoder: str | None = None
+_hw_encoder_checked = False
+_hw_encoder_lock = asyncio.Lock()
 
-    logger.info("Writing subtitles to %s", subtitles_path)
-    subtitles_path.write_text(srt_content, encoding="utf-8")
 
+async def _hw_encoder_works(encoder: str) -> bool:
+    # Энкодер в `ffmpeg -encoders` ещё не значит, что есть GPU/драйвер — проверяем
+    # пробным кодированием пары кадров.
+    try:
+        _, _, returncode = await _run_subprocess(
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            "color=c=black:s=256x256:d=0.1",
+            *_HW_ENCODER_ARGS[encoder],
+            "-f",
+            "null",
+            "-",
+            timeout=20,
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+    return returncode == 0
+
+
+async def _video_encoder_args() -> tuple[str, ...]:
+    global _hw_encoder, _hw_encoder_checked
+    if FFMPEG_HW_ENCODER and not _hw_encoder_checked:
+        async with _hw_encoder_lock:
+            if not _hw_encoder_checked:
+                candidates = tuple(_HW_ENCODER_ARGS) if FFMPEG_HW_ENCODER == "auto" else (FFMPEG_HW_ENCODER,)
+                for encoder in candidates:
+                    if encoder in _HW_ENCODER_ARGS and await _hw_encoder_works(encoder):
+                        _hw_encoder = encoder
+                        break
+                _hw_encoder_checked = True
+                logger.info("Burn video encoder: %s", _hw_encoder or "libx264 (hardware encoder unavailable)")
+
+    if _hw_encoder:
+        return _HW_ENCODER_ARGS[_hw_encoder]
+    return (
+        "-c:v",
+        "libx264",
+        "-preset",
+        FFMPEG_PRESET,
+        "-tune",
+        "fastdecode",
+        "-crf",
+        "26",
+        "-pix_fmt",
+        "yuv420p",
+    )
+
+
+async def _build_hard_burn_cmd(video_path: Path, subtitles_path: Path, output_path: Path) -> tuple[str, ...]:
     # 🔥 1. Узнаём разрешение видео
     width, height = await get_video_resolution(video_path)
+    # AAC уже годится для mp4 — копируем дорожку вместо повторного кодирования.
+    audio_codec = "copy" if (await probe_media(video_path)).get("audio_codec") == "aac" else "aac"
 
     # 🔥 2. Динамический размер шрифта
     # Используем меньшую сторону кадра, чтобы на вертикальных видео
@@ -627,10 +932,10 @@ async def burn_subtitles(video_path: Path, srt_content: str) -> Path:
     # 🔥 3. Динамическая обводка
     outline = max(1, fontsize // 12)
 
-    logger.info(f"Dynamic subtitle style: fontsize={fontsize}, outline={outline}")
+    logger.info("Dynamic subtitle style: fontsize=%d, outline=%d", fontsize, outline)
 
     # 🔥 4. FFmpeg команда
-    cmd = (
+    return (
         "ffmpeg",
         "-y",
         "-i",
@@ -640,29 +945,201 @@ async def burn_subtitles(video_path: Path, srt_content: str) -> Path:
         f"force_style='Fontsize={fontsize},Outline={outline},Shadow=0,"
         "PrimaryColour=&HFFFFFF&,OutlineColour=&H000000&,BackColour=&H80000000&,"
         "WrapStyle=2,Alignment=2,MarginV=96,MarginL=42,MarginR=42,BorderStyle=3'", 
+        *(await _video_encoder_args()),
+        "-threads",
+        str(FFMPEG_THREADS),
+        "-c:a",
+        audio_codec,
+        "-movflags",
+        "+faststart",
+        str(output_path),
+    )
+
+
+# ISO 639-2 codes for the subtitle track language tag (players show it in the track menu).
+_SUBTITLE_LANGUAGE_CODES = {
+    "english": "eng",
+    "arabic": "ara",
+    "uzbek": "uzb",
+    "russian": "rus",
+    "turkish": "tur",
+    "tajik": "tgk",
+    "kazakh": "kaz",
+    "kyrgyz": "kir",
+}
+
+
+def _build_soft_mux_cmd(
+    video_path: Path, subtitles_path: Path, output_path: Path, language: str | None = None
+) -> tuple[str, ...]:
+    # Soft subtitles: SRT goes in as a mov_text track, video/audio are stream-copied (no re-encode).
+    language_code = _SUBTITLE_LANGUAGE_CODES.get((language or "").strip().lower(), "und")
+    return (
+        "ffmpeg",
+        "-y",
+        "-i",
+        str(video_path),
+        "-i",
+        str(subtitles_path),
+        "-map",
+        "0:v:0",
+        "-map",
+        "0:a?",
+        "-map",
+        "1:0",
         "-c:v",
-        "libx264",
-        "-preset",
-        "veryfast",
-        "-pix_fmt",
-        "yuv420p",
+        "copy",
         "-c:a",
-        "aac",
+        "copy",
+        "-c:s",
+        "mov_text",
+        "-metadata:s:s:0",
+        f"language={language_code}",
+        "-movflags",
+        "+faststart",
         str(output_path),
     )
 
-    logger.info("Starting ffmpeg burn")
 
+# Бюджет времени на прожиг зависит от длины видео: max(180 c, длительность × 3).
+_BURN_MIN_TIMEOUT_SECONDS = 180.0
+_BURN_TIMEOUT_PER_MEDIA_SECOND = 3.0
+# Прогноз по -progress: если ожидаемое полное время больше бюджета × 1.5, прерываем сразу.
+_BURN_ETA_GRACE = 1.5
+_BURN_ETA_WARMUP_SECONDS = 15.0
+
+
+async def _run_ffmpeg_with_progress(
+    cmd: tuple[str, ...], *, media_duration: float, pass_fds: tuple[int, ...] = ()
+) -> tuple[str, int]:
+    """Run ffmpeg with `-progress pipe:1` and an adaptive timeout.
+    Returns (stderr tail, returncode); raises asyncio.TimeoutError when the budget is
+    exhausted or the projected finish time is clearly beyond it.
+    """
+    budget = max(_BURN_MIN_TIMEOUT_SECONDS, media_duration * _BURN_TIMEOUT_PER_MEDIA_SECOND)
+    loop = asyncio.get_running_loop()
+    stderr_tail: deque[str] = deque(maxlen=40)
+
+    async with SUBPROCESS_SEMAPHORE:
+        started = loop.time()
+        process = await asyncio.create_subprocess_exec(
+            cmd[0],
+            "-progress",
+            "pipe:1",
+            "-nostats",
+            *cmd[1:],
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            pass_fds=pass_fds,
+        )
+
+        async def _drain_stderr() -> None:
+            # stderr читаем параллельно, иначе ffmpeg может встать на заполненном пайпе.
+            async for line in process.stderr:
+                stderr_tail.append(line.decode(errors="replace").rstrip())
+
+        async def _watch_progress() -> None:
+            async for line in process.stdout:
+                key, _, value = line.decode(errors="replace").strip().partition("=")
+                # out_time_ms у ffmpeg исторически тоже в микросекундах.
+                if key not in {"out_time_us", "out_time_ms"} or not value.isdigit():
+                    continue
+                done_seconds = int(value) / 1_000_000
+                elapsed = loop.time() - started
+                if elapsed < _BURN_ETA_WARMUP_SECONDS or done_seconds <= 0 or media_duration <= 0:
+                    continue
+                projected = elapsed * media_duration / done_seconds
+                if projected > budget * _BURN_ETA_GRACE:
+                    logger.error(
+                        "ffmpeg burn too slow: %.1fs of %.1fs done in %.1fs, projected %.0fs > budget %.0fs",
+                        done_seconds,
+                        media_duration,
+                        elapsed,
+                        projected,
+                        budget,
+                    )
+                    raise asyncio.TimeoutError
+            await process.wait()
+
+        stderr_task = asyncio.create_task(_drain_stderr())
+        try:
+            await asyncio.wait_for(_watch_progress(), timeout=budget)
+        except asyncio.TimeoutError:
+            logger.error("ffmpeg burn stopped after %.0f seconds (budget %.0fs)", loop.time() - started, budget)
+            raise
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            await stderr_task
+
+    return "\n".join(stderr_tail), process.returncode
+
+
+def _write_subtitles_memfd(srt_content: str) -> int | None:
+    if not hasattr(os, "memfd_create"):
+        return None
     try:
-        stdout, stderr, returncode = await _run_subprocess(*cmd, timeout=180)
+        fd = os.memfd_create("subs", os.MFD_CLOEXEC)
+    except OSError:
+        return None
+    try:
+        with open(fd, "wb", closefd=False) as f:
+            f.write(srt_content.encode("utf-8"))
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+async def burn_subtitles(
+    video_path: Path,
+    srt_content: str,
+    *,
+    hard_burn: bool = True,
+    language: str | None = None,
+) -> Path:
+    """Render subtitles into the video (hard_burn) or mux them as a soft mov_text track.
+    Soft mode skips the full re-encode but needs a player that shows embedded subtitles;
+    `language` (e.g. "Russian") only tags the soft track.
+    """
+    uid = uuid4().hex
+    output_path = TEMP_DIR / f"out_{uid}.mp4"
+
+    # На Linux SRT живёт в memfd и передаётся ffmpeg как /proc/self/fd/N — без файла на диске.
+    memfd = _write_subtitles_memfd(srt_content)
+    if memfd is not None:
+        subtitles_path = Path(f"/proc/self/fd/{memfd}")
+        pass_fds: tuple[int, ...] = (memfd,)
+    else:
+        subtitles_path = TEMP_DIR / f"subs_{uid}.srt"
+        pass_fds = ()
+        logger.info("Writing subtitles to %s", subtitles_path)
+        subtitles_path.write_text(srt_content, encoding="utf-8")
+
+    try:
+        if hard_burn:
+            cmd = await _build_hard_burn_cmd(video_path, subtitles_path, output_path)
+            logger.info("Starting ffmpeg burn")
+        else:
+            cmd = _build_soft_mux_cmd(video_path, subtitles_path, output_path, language)
+            logger.info("Starting ffmpeg soft subtitle mux")
+
+        media_duration = (await probe_media(video_path)).get("duration") or 0.0
+        stderr, returncode = await _run_ffmpeg_with_progress(
+            cmd, media_duration=media_duration, pass_fds=pass_fds
+        )
 
         if returncode != 0:
-            raise RuntimeError(stderr or stdout)
+            raise RuntimeError(stderr or f"ffmpeg exited with code {returncode}")
 
     except asyncio.TimeoutError:
         raise RuntimeError("ffmpeg timed out")
     finally:
-        subtitles_path.unlink(missing_ok=True)
+        if memfd is not None:
+            os.close(memfd)
+        else:
+            subtitles_path.unlink(missing_ok=True)
 
     logger.info("Video created: %s", output_path)
     return output_path
@@ -672,41 +1149,44 @@ async def download_video_from_url(url: str) -> Path:
     if not is_supported_media_url(url):
         raise ValueError("Unsupported media URL")
 
-    # 1️⃣ СНАЧАЛА получаем метаданные, чтобы быстро узнать длительность
-    stdout, stderr, returncode = await _run_subprocess(
-        "yt-dlp",
-        "--dump-json",
-        url,
-        timeout=20,
-    )
-
-    if returncode != 0:
-        raise RuntimeError(stderr or stdout)
-
-    info = json.loads(stdout)
-    duration = float(info.get("duration") or 0)
-
-    # 2️⃣ Лимит длительности отключен: скачиваем видео любой длины
-
-    # 3️⃣ Теперь скачиваем
+    # Один вызов yt-dlp, без отдельного прохода экстрактора ради --dump-json.
+    # По умолчанию лимитов нет; если заданы, yt-dlp отсекает видео по метаданным до скачивания.
     download_dir = TEMP_DIR / f"video_{uuid4()}"
     download_dir.mkdir(parents=True, exist_ok=True)
     output_template = download_dir / "%(title)s.%(ext)s"
 
+    limits: list[str] = []
+    if SUBTITLE_URL_MAX_DURATION_SEC > 0:
+        limits.append(f"duration <=? {SUBTITLE_URL_MAX_DURATION_SEC}")
+    if SUBTITLE_URL_MAX_FILESIZE_MB > 0:
+        limits.append(f"filesize_approx <=? {SUBTITLE_URL_MAX_FILESIZE_MB * 1024 * 1024}")
+    match_filter = ("--match-filter", " & ".join(limits)) if limits else ()
+
     stdout, stderr, returncode = await _run_subprocess(
         "yt-dlp",
+        "--socket-timeout",
+        "10",
         "-f",
         "bv*+ba/b",
+        *match_filter,
+        "--print",
+        "after_move:filepath",
         "-o",
         str(output_template),
         url,
+        timeout=SUBTITLE_URL_DOWNLOAD_TIMEOUT,
+        semaphore=DOWNLOAD_SEMAPHORE,
     )
 
     if returncode != 0:
         raise RuntimeError(stderr or stdout)
 
-    files = sorted(download_dir.glob("*"))
-    if not files:
+    lines = stdout.strip().splitlines()
+    if not lines:
+        if limits:
+            # --match-filter skips rejected videos without an error and without saying which
+            # condition failed, so the error is neutral; the handler lists the configured limits.
+            raise ValueError("Video exceeds download limits")
         raise FileNotFoundError("yt-dlp produced no files")
 
-    return max(files, key=lambda p: p.stat().st_size)
+    return Path(lines[-1])
@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+
+from config import TRANSLATION_CACHE_ENABLED, TRANSLATION_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Persistent exact-match cache of segment translations: repeated lines across episodes
+# ("Yes.", names, greetings) are answered locally instead of being re-sent to the LLM.
+# Stores the raw model output; glossary rules are applied by the caller on every read.
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+
+
+def _key(text: str, source_language: str, target_language: str, variant: str) -> str:
+    raw = f"{variant}\x00{source_language}\x00{target_language}\x00{text}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(TRANSLATION_CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, translation TEXT NOT NULL)"
+        )
+        _conn.commit()
+    return _conn
+
+
+def _get_many_sync(keys: list[str]) -> dict[str, str]:
+    with _lock:
+        conn = _connection()
+        found: dict[str, str] = {}
+        # SQLite limits bound parameters per statement; 200 segments fit in one or two queries.
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, translation FROM translations WHERE key IN ({placeholders})",
+                batch,
+            )
+            found.update(rows)
+        return found
+
+
+def _put_many_sync(rows: list[tuple[str, str]]) -> None:
+    with _lock:
+        conn = _connection()
+        conn.executemany("INSERT OR REPLACE INTO translations (key, translation) VALUES (?, ?)", rows)
+        conn.commit()
+
+
+async def get_cached_translations(
+    texts: list[str],
+    source_language: str,
+    target_language: str,
+    variant: str = "",
+) -> dict[str, str]:
+    """Возвращает {text: translation} для найденных в кэше строк.
+    `variant` — всё, что кроме языков влияет на перевод (модель, правила промпта).
+    """
+    if not TRANSLATION_CACHE_ENABLED or not texts:
+        return {}
+
+    keys = {_key(text, source_language, target_language, variant): text for text in texts}
+    try:
+        found = await asyncio.to_thread(_get_many_sync, list(keys))
+    except sqlite3.Error:
+        logger.warning("Translation cache lookup failed; translating without cache", exc_info=True)
+        return {}
+
+    return {keys[key]: translation for key, translation in found.items()}
+
+
+async def store_translations(
+    translations: dict[str, str],
+    source_language: str,
+    target_language: str,
+    variant: str = "",
+) -> None:
+    if not TRANSLATION_CACHE_ENABLED or not translations:
+        return
+
+    rows = [
+        (_key(text, source_language, target_language, variant), translation)
+        for text, translation in translations.items()
+        if translation
+    ]
+    try:
+        await asyncio.to_thread(_put_many_sync, rows)
+    except sqlite3.Error:
+        logger.warning("Translation cache write failed", exc_info=True)
@@ -1,33 +1,70 @@
 import asyncio
+import json
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any
 
 
-FFPROBE_STREAM_CMD = (
+# Один вызов ffprobe отдаёт длительность, размеры кадра и параметры аудиодорожки — раньше
+# это были отдельные процессы для duration (stream, затем format), width/height и start_time.
+FFPROBE_JSON_CMD = (
     "ffprobe",
     "-v",
     "error",
-    "-select_streams",
-    "v:0",
     "-show_entries",
-    "stream=duration",
+    "stream=codec_type,codec_name,width,height,duration,start_time:format=duration",
     "-of",
-    "default=noprint_wrappers=1:nokey=1",
+    "json",
 )
 
-FFPROBE_FORMAT_CMD = (
-    "ffprobe",
-    "-v",
-    "error",
-    "-show_entries",
-    "format=duration",
-    "-of",
-    "default=noprint_wrappers=1:nokey=1",
-)
+
+# ffprobe results keyed by file identity (device, inode, mtime, size): the same download is
+# probed by the handler, the pipeline and later stages, but only the first probe forks ffprobe.
+_PROBE_CACHE_MAX_ENTRIES = 256
+_probe_cache: OrderedDict[tuple[int, int, int, int], dict[str, Any]] = OrderedDict()
+
+
+def _probe_cache_key(path: Path) -> tuple[int, int, int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def get_cached_probe(path: Path) -> dict[str, Any]:
+    key = _probe_cache_key(path)
+    if key is None or key not in _probe_cache:
+        return {}
+    _probe_cache.move_to_end(key)
+    return _probe_cache[key]
+
+
+def store_probe(path: Path, **fields: Any) -> None:
+    key = _probe_cache_key(path)
+    if key is None:
+        return
+    _probe_cache.setdefault(key, {}).update(fields)
+    _probe_cache.move_to_end(key)
+    while len(_probe_cache) > _PROBE_CACHE_MAX_ENTRIES:
+        _probe_cache.popitem(last=False)
 
 
-async def _run_ffprobe_duration(cmd: tuple[str, ...], path: Path) -> float | None:
+def _positive_float(value: Any) -> float | None:
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        return None
+    return result if result > 0 else None
+
+
+async def probe_media(path: Path) -> dict[str, Any]:
+    cached = get_cached_probe(path)
+    if "duration" in cached:
+        return cached
+
     process = await asyncio.create_subprocess_exec(
-        *cmd,
+        *FFPROBE_JSON_CMD,
         str(path),
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
@@ -35,32 +72,40 @@ async def _run_ffprobe_duration(cmd: tuple[str, ...], path: Path) -> float | Non
     stdout, stderr = await process.communicate()
 
     if process.returncode != 0:
-        return None
+        raise RuntimeError(stderr.decode(errors="ignore").strip() or "ffprobe failed")
 
-    output = (stdout.decode() or "").strip()
     try:
-        value = float(output)
-    except (TypeError, ValueError):
-        return None
-
-    if value <= 0:
-        return None
-
-    return value
+        data = json.loads(stdout or b"{}")
+    except ValueError as exc:
+        raise RuntimeError(f"Unexpected ffprobe output: {exc}")
+
+    streams = data.get("streams") or []
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+
+    # 1) Stream duration (often works for mp4)
+    # 2) Fallback to container format duration (more reliable for webm and audio)
+    duration = _positive_float(video.get("duration"))
+    if duration is None:
+        duration = _positive_float((data.get("format") or {}).get("duration"))
+    if duration is None:
+        raise RuntimeError("Unable to determine video duration")
+
+    fields: dict[str, Any] = {
+        "duration": duration,
+        "audio_codec": audio.get("codec_name"),
+        "audio_start_time": audio.get("start_time"),
+    }
+    if video.get("width") and video.get("height"):
+        fields["width"] = int(video["width"])
+        fields["height"] = int(video["height"])
+
+    store_probe(path, **fields)
+    return get_cached_probe(path) or fields
 
 
 async def get_video_duration(path: Path) -> float:
-    # 1) Try stream duration (often works for mp4)
-    duration = await _run_ffprobe_duration(FFPROBE_STREAM_CMD, path)
-    if duration is not None:
-        return duration
-
-    # 2) Fallback to container format duration (more reliable for webm)
-    duration = await _run_ffprobe_duration(FFPROBE_FORMAT_CMD, path)
-    if duration is not None:
-        return duration
-
-    raise RuntimeError("Unable to determine video duration")
+    return (await probe_media(path))["duration"]
 
 
 async def validate_video_duration(path: Path, max_seconds: int = 0) -> None: